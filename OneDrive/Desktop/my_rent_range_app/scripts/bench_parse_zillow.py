@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Zillow refresh pipeline on synthetic ZHVI files
+Times parse_zillow_csv(), the mapping/match step and JSON serialization at
+metro, city and zip scale, reports throughput and peak traced memory per
+stage, and compares against a saved baseline.
+
+Usage:
+    python bench_parse_zillow.py                     # all scales
+    python bench_parse_zillow.py --scales metro,city
+    python bench_parse_zillow.py --save-baseline     # record a new baseline
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from parse_zillow_data import create_city_mapping, parse_zillow_csv
+from region_matcher import RegionMatcher
+from zhvi_synthetic import SCALES, write_synthetic_csv
+
+BASELINE_PATH = Path(__file__).parent / 'bench_baseline.json'
+DATA_DIR = Path(tempfile.gettempdir()) / 'zhvi_bench'
+
+def synthetic_file(scale, months, seed):
+    """Path to a cached synthetic CSV, generating it on first use"""
+    rows = SCALES[scale]
+    path = DATA_DIR / f"zhvi_{scale}_{rows}x{months}_seed{seed}.csv"
+    if not path.exists():
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        print(f"Generating {path.name}...")
+        write_synthetic_csv(path, rows, months, seed)
+    return path
+
+def run_stages(csv_path):
+    """Run each pipeline stage once, yielding (stage, seconds, items)"""
+    start = time.perf_counter()
+    metro_data = parse_zillow_csv(csv_path)
+    yield 'parse', time.perf_counter() - start, len(metro_data)
+
+    start = time.perf_counter()
+    matcher = RegionMatcher.from_mapping(create_city_mapping())
+    matched_data, _ = matcher.match(metro_data)
+    yield 'match', time.perf_counter() - start, len(metro_data)
+
+    start = time.perf_counter()
+    json.dumps(matched_data, indent=2)
+    yield 'serialize', time.perf_counter() - start, len(matched_data)
+
+def bench_scale(csv_path, repeat, measure_memory):
+    """Best-of-N timings per stage, plus traced peak memory from one extra run"""
+    results = {}
+    for _ in range(repeat):
+        for stage, seconds, items in run_stages(csv_path):
+            best = results.get(stage)
+            if best is None or seconds < best['seconds']:
+                results[stage] = {
+                    'seconds': seconds,
+                    'items': items,
+                    'items_per_sec': items / seconds if seconds > 0 else None,
+                }
+
+    if measure_memory:
+        # tracemalloc slows Python down, so it never runs during timing
+        tracemalloc.start()
+        stages = run_stages(csv_path)
+        while True:
+            tracemalloc.reset_peak()
+            try:
+                stage, _, _ = next(stages)
+            except StopIteration:
+                break
+            results[stage]['peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    return results
+
+# Stages faster than this are too noisy to flag as regressions
+NOISE_FLOOR_SECONDS = 0.05
+
+def compare(results, baseline, tolerance):
+    """Print ratios against the baseline; return the list of regressions"""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline.get(scale, {}).get(stage)
+            if not base:
+                continue
+            ratio = result['seconds'] / base['seconds'] if base['seconds'] else 1.0
+            flag = ''
+            if ratio > 1 + tolerance and result['seconds'] > NOISE_FLOOR_SECONDS:
+                flag = '  REGRESSION'
+                regressions.append(f"{scale}/{stage}: {ratio:.2f}x baseline time")
+            print(f"  {scale:<6} {stage:<10} {ratio:5.2f}x baseline{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default=','.join(SCALES), help='comma-separated scales to run')
+    parser.add_argument('--months', type=int, default=300, help='monthly columns per synthetic file')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic data seed')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per scale (best is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the traced memory run')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='baseline JSON to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown vs baseline before failing (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for scale in [s.strip() for s in args.scales.split(',') if s.strip()]:
+        csv_path = synthetic_file(scale, args.months, args.seed)
+        print(f"\n{scale}: {SCALES[scale]:,} rows x {args.months} months")
+        results[scale] = bench_scale(csv_path, args.repeat, not args.no_memory)
+        for stage, result in results[scale].items():
+            rate = f"{result['items_per_sec']:,.0f}/s" if result['items_per_sec'] else '-'
+            peak = f"{result['peak_mb']:.1f} MB" if 'peak_mb' in result else '-'
+            print(f"  {stage:<10} {result['seconds']:8.3f}s  {rate:>14}  peak {peak}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("\nNo baseline yet, run with --save-baseline to create one")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    print("\nCompared with baseline:")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): " + '; '.join(regressions))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
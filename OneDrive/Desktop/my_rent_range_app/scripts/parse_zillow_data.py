@@ -4,83 +4,379 @@ Parse Zillow ZHVI CSV and extract latest rent estimates
 Converts home values to rent estimates using standard conversion ratios
 """
 
+import argparse
 import csv
+import gzip
+import hashlib
+import io
 import json
+import lzma
+import time
+import zipfile
 from pathlib import Path
 from datetime import datetime
 
+from region_matcher import RegionMatcher
+from zhvi_report import RunReport, timed_stage
+
 # Zillow CSV path
 CSV_PATH = r"C:\Users\kturn\OneDrive\Desktop\Metro_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"
 
+# Generated asset read by ZillowDataLoader
+OUTPUT_PATH = Path(__file__).parent.parent / 'lib' / 'data' / 'sources' / 'zillow_data.json'
+
+# Merged {city: {dataset: record}} output of --manifest runs
+BATCH_OUTPUT_PATH = OUTPUT_PATH.with_name('zillow_datasets.json')
+
+# Per-city rolling-window analytics written by --analytics
+ANALYTICS_OUTPUT_PATH = OUTPUT_PATH.with_name('zillow_analytics.json')
+
+# Per-city low/mid/high rent bands written by --tiers
+RENT_BANDS_OUTPUT_PATH = OUTPUT_PATH.with_name('zillow_rent_bands.json')
+
+# Per-city monthly rent series written by --history
+HISTORY_OUTPUT_PATH = OUTPUT_PATH.with_name('zillow_rent_history.bin')
+
+# Nearest-metro estimates for cities without a metro, written by --fallback
+FALLBACK_OUTPUT_PATH = OUTPUT_PATH.with_name('zillow_fallback.json')
+
+# Top-k / bottom-k market rankings written by --rankings
+RANKINGS_OUTPUT_PATH = OUTPUT_PATH.with_name('zillow_rankings.json')
+
+# Zip-level neighborhood aggregates written by --neighborhoods
+NEIGHBORHOODS_OUTPUT_PATH = OUTPUT_PATH.with_name('neighborhoods_data.json')
+
 # Conversion ratio: Rent typically ~0.5-0.7% of home value per month
 # Using 0.55% as realistic estimate (annual rent = 6.6% of home value)
 # This accounts for ZHVI being home values, not rent, and uses market standard ratios
 RENT_TO_HOME_VALUE_RATIO = 0.0055
 
+# Per-metro ratios fitted from a rent index by --calibrate (see zhvi_calibration.py)
+RENT_RATIOS_PATH = Path(__file__).parent / 'rent_ratios.json'
+
+# Months of data used for the latest value and trend (3 recent vs 3 previous)
+WINDOW_SIZE = 6
+
+# Compressed inputs are decompressed through a read buffer this large
+DECOMPRESS_BUFFER_BYTES = 1024 * 1024
+
+# Bump when the incremental state layout or record computation changes
+STATE_VERSION = 1
+
+def detect_compression(csv_path):
+    """Return 'gzip', 'zip', 'xz' or None based on the file's magic bytes"""
+    with open(csv_path, 'rb') as f:
+        magic = f.read(6)
+    if magic.startswith(b'\x1f\x8b'):
+        return 'gzip'
+    if magic.startswith(b'PK\x03\x04'):
+        return 'zip'
+    if magic.startswith(b'\xfd7zXZ\x00'):
+        return 'xz'
+    return None
+
+def open_zhvi_binary(csv_path):
+    """Open a ZHVI CSV as a binary stream, decompressing gzip/zip/xz on the fly"""
+    compression = detect_compression(csv_path)
+    if compression is None:
+        return open(csv_path, 'rb')
+    
+    if compression == 'gzip':
+        stream = gzip.open(csv_path, 'rb')
+    elif compression == 'xz':
+        stream = lzma.open(csv_path, 'rb')
+    else:
+        # The member stream keeps the archive file open after the ZipFile closes
+        with zipfile.ZipFile(csv_path) as archive:
+            names = [n for n in archive.namelist() if n.lower().endswith('.csv')] or archive.namelist()
+            if not names:
+                raise ValueError(f"No CSV found in {csv_path}")
+            stream = archive.open(names[0])
+    return io.BufferedReader(stream, buffer_size=DECOMPRESS_BUFFER_BYTES)
+
+def open_zhvi_csv(csv_path):
+    """Open a plain or compressed ZHVI CSV as text for csv.reader"""
+    return io.TextIOWrapper(open_zhvi_binary(csv_path), encoding='utf-8', newline='')
+
+def get_date_columns(header_row):
+    """Extract all monthly data columns, oldest first"""
+    return sorted(col for col in header_row if col and '-' in col)
+
 def get_latest_columns(header_row):
     """Extract the latest 6 months of data columns for trend calculation"""
-    date_columns = [col for col in header_row if col and '-' in col]
-    date_columns.sort(reverse=True)
-    return date_columns[:6]  # Last 6 months
+    date_columns = get_date_columns(header_row)
+    date_columns.reverse()
+    return date_columns[:WINDOW_SIZE]  # Last 6 months
+
+def build_column_plan(header_row):
+    """Resolve the indices of the columns we read, once per file"""
+    # Last occurrence wins on duplicate headers, same as csv.DictReader
+    positions = {col: i for i, col in enumerate(header_row)}
+    latest_cols = get_latest_columns(header_row)
+    return {
+        'region_index': positions.get('RegionName'),
+        'state_index': positions.get('StateName'),
+        'latest_cols': latest_cols,
+        'value_indices': [positions[col] for col in latest_cols],
+    }
+
+def iter_projected_rows(reader, plan, region_filter=None, stats=None):
+    """Yield (region_name, state, raw_values) with only the planned fields pulled out
+    
+    When a stats dict is passed, rows read, rows without a region or state
+    and rows dropped by region_filter are counted into it.
+    """
+    region_index = plan['region_index']
+    state_index = plan['state_index']
+    value_indices = plan['value_indices']
+    
+    for row in reader:
+        width = len(row)
+        region_name = row[region_index].strip() if region_index is not None and region_index < width else ''
+        state = row[state_index].strip() if state_index is not None and state_index < width else ''
+        if stats is not None:
+            stats['rows_read'] = stats.get('rows_read', 0) + 1
+        
+        if not region_name or not state:
+            if stats is not None:
+                stats['rows_missing_region'] = stats.get('rows_missing_region', 0) + 1
+            continue
+        
+        # Skip regions we never match before touching any value columns
+        if region_filter is not None and region_name not in region_filter:
+            if stats is not None:
+                stats['rows_filtered'] = stats.get('rows_filtered', 0) + 1
+            continue
+        
+        raw_values = [row[i] if i < width else '' for i in value_indices]
+        yield region_name, state, raw_values
 
-def parse_zillow_csv():
-    """Parse Zillow CSV and extract metro data"""
+def compute_metro_record(region_name, state, raw_values, latest_cols):
+    """Build one metro record from its latest raw values, or None if it has no data"""
+    # Get latest values
+    values = []
+    for val in raw_values:
+        val = val.strip()
+        if val:
+            try:
+                values.append(float(val))
+            except ValueError:
+                pass
+    
+    if not values:
+        return None
+    
+    # Calculate average of last 3 months (most recent data)
+    latest_value = sum(values[:3]) / len(values[:3]) if values[:3] else values[0]
+    
+    # Calculate trend (comparing last 3 months vs previous 3 months)
+    trend = 'stable'
+    if len(values) >= WINDOW_SIZE:
+        recent_avg = sum(values[:3]) / 3
+        previous_avg = sum(values[3:6]) / 3
+        change_pct = ((recent_avg - previous_avg) / previous_avg) * 100
+        
+        if change_pct > 2:
+            trend = 'up'
+        elif change_pct < -2:
+            trend = 'down'
+    
+    # Convert home value to rent estimate
+    rent_estimate = latest_value * RENT_TO_HOME_VALUE_RATIO
+    
+    return {
+        'region_name': region_name,
+        'state': state,
+        'home_value': latest_value,
+        'rent_estimate': round(rent_estimate, 0),
+        'trend': trend,
+        'last_updated': latest_cols[0] if latest_cols else '2024-12-31',
+    }
+
+def rent_ratio(region_name, calibration=None):
+    """Rent-to-home-value ratio for one metro
+    
+    Without a calibration this is RENT_TO_HOME_VALUE_RATIO; with one, the
+    metro's fitted ratio, or the national ratio for metros it has no fit for.
+    """
+    if calibration is None:
+        return RENT_TO_HOME_VALUE_RATIO
+    fit = calibration['ratios'].get(region_name)
+    return fit['ratio'] if fit else calibration['national_ratio']
+
+def apply_rent_ratios(records, calibration):
+    """Recompute rent estimates with calibrated per-metro ratios, in place"""
+    for record in records.values():
+        ratio = rent_ratio(record['region_name'], calibration)
+        record['rent_estimate'] = round(record['home_value'] * ratio, 0)
+
+def parse_zillow_csv(csv_path=CSV_PATH, region_filter=None, report=None):
+    """Parse Zillow CSV and extract metro data
+    
+    Only RegionName, StateName and the latest date columns are pulled out of
+    each row. Pass region_filter (a set of RegionName values) to drop rows we
+    will never match before any float conversion. Pass a RunReport to time
+    the header scan, row parsing and value computation separately.
+    """
     metro_data = {}
+    stats = {} if report is not None else None
     
-    with open(CSV_PATH, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        header = reader.fieldnames
+    with open_zhvi_csv(csv_path) as f:
+        reader = csv.reader(f)
+        start = time.perf_counter()
+        header = next(reader, [])
         
         # Get latest date columns
-        latest_cols = get_latest_columns(header)
+        plan = build_column_plan(header)
+        latest_cols = plan['latest_cols']
         print(f"Latest columns: {latest_cols[:3]}...")
+        if report is not None:
+            report.add_time('header_scan', time.perf_counter() - start)
         
-        for row in reader:
-            region_name = row.get('RegionName', '').strip()
-            state = row.get('StateName', '').strip()
-            
-            if not region_name or not state:
-                continue
-            
-            # Get latest values
-            values = []
-            for col in latest_cols:
-                val = row.get(col, '').strip()
-                if val:
-                    try:
-                        values.append(float(val))
-                    except ValueError:
-                        pass
-            
-            if not values:
-                continue
-            
-            # Calculate average of last 3 months (most recent data)
-            latest_value = sum(values[:3]) / len(values[:3]) if values[:3] else values[0]
-            
-            # Calculate trend (comparing last 3 months vs previous 3 months)
-            trend = 'stable'
-            if len(values) >= 6:
-                recent_avg = sum(values[:3]) / 3
-                previous_avg = sum(values[3:6]) / 3
-                change_pct = ((recent_avg - previous_avg) / previous_avg) * 100
-                
-                if change_pct > 2:
-                    trend = 'up'
-                elif change_pct < -2:
-                    trend = 'down'
-            
-            # Convert home value to rent estimate
-            rent_estimate = latest_value * RENT_TO_HOME_VALUE_RATIO
-            
-            metro_data[region_name] = {
-                'region_name': region_name,
-                'state': state,
-                'home_value': latest_value,
-                'rent_estimate': round(rent_estimate, 0),
-                'trend': trend,
-                'last_updated': latest_cols[0] if latest_cols else '2024-12-31',
-            }
+        rows = iter_projected_rows(reader, plan, region_filter, stats)
+        for region_name, record in timed_records(rows, latest_cols, report, stats):
+            metro_data[region_name] = record
+    
+    return metro_data
+
+def timed_records(rows, latest_cols, report=None, stats=None, compute=compute_metro_record):
+    """Yield (region_name, record) for projected rows that have data
+    
+    With a RunReport, row parsing (time spent waiting on rows) and
+    computation are timed apart once the rows run out, and the stats
+    iter_projected_rows() filled in are added to its counters. compute is
+    called as compute(region_name, state, raw_values, latest_cols).
+    """
+    if report is None:
+        for region_name, state, raw_values in rows:
+            record = compute(region_name, state, raw_values, latest_cols)
+            if record is not None:
+                yield region_name, record
+        return
+    
+    parse_seconds = 0.0
+    compute_seconds = 0.0
+    computed = 0
+    skipped = 0
+    
+    start = time.perf_counter()
+    for region_name, state, raw_values in rows:
+        parsed = time.perf_counter()
+        parse_seconds += parsed - start
+        
+        record = compute(region_name, state, raw_values, latest_cols)
+        computed += 1
+        
+        start = time.perf_counter()
+        compute_seconds += start - parsed
+        if record is not None:
+            yield region_name, record
+            start = time.perf_counter()
+        else:
+            skipped += 1
+    parse_seconds += time.perf_counter() - start
+    
+    stats = stats or {}
+    report.add_time('row_parse', parse_seconds, rows=stats.get('rows_read', computed))
+    report.add_time('compute', compute_seconds, rows=computed)
+    for name, value in stats.items():
+        report.count(name, value)
+    report.count('rows_missing_values', skipped)
+
+def get_state_path(output_path):
+    """Incremental state file stored next to the JSON output"""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + '.state.json')
+
+def state_fingerprint(city_mapping):
+    """Hash of every setting that changes computed records"""
+    payload = json.dumps({
+        'version': STATE_VERSION,
+        'ratio': RENT_TO_HOME_VALUE_RATIO,
+        'window': WINDOW_SIZE,
+        'mapping': sorted(city_mapping.items()),
+    })
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def row_digest(state, latest_cols, raw_values):
+    """Digest of the fields a region's record is computed from"""
+    payload = '\x1f'.join([state, *latest_cols, *raw_values])
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+def load_state(state_path, fingerprint):
+    """Load incremental state, or start fresh if it is missing or stale"""
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {'fingerprint': fingerprint, 'sources': {}}
+    
+    if state.get('fingerprint') != fingerprint:
+        print("Settings changed, discarding incremental state")
+        return {'fingerprint': fingerprint, 'sources': {}}
+    
+    return state
+
+def save_state(state_path, state):
+    """Write incremental state atomically"""
+    state_path = Path(state_path)
+    tmp_path = state_path.with_name(state_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, separators=(',', ':'))
+    tmp_path.replace(state_path)
+
+def parse_zillow_csv_incremental(csv_path, state_path, city_mapping, region_filter=None, report=None):
+    """Parse Zillow CSV, recomputing only regions whose window changed
+    
+    State is kept per source file name, so several tiers and geographies can
+    share one state file. Each region stores a digest of its state, latest
+    column names and raw values plus the record computed from them. With a
+    RunReport, the digest check counts as compute time.
+    """
+    state = load_state(state_path, state_fingerprint(city_mapping))
+    source_key = Path(csv_path).name
+    previous = state['sources'].get(source_key, {})
+    current = {}
+    metro_data = {}
+    stats = {} if report is not None else None
+    counts = {'reused': 0, 'recomputed': 0}
+    
+    def compute(region_name, state_name, raw_values, latest_cols):
+        digest = row_digest(state_name, latest_cols, raw_values)
+        cached = previous.get(region_name)
+        
+        if cached is not None and cached['digest'] == digest:
+            record = dict(cached['record']) if cached['record'] is not None else None
+            counts['reused'] += 1
+        else:
+            record = compute_metro_record(region_name, state_name, raw_values, latest_cols)
+            counts['recomputed'] += 1
+        
+        # Duplicate rows keep the last digest, matching which row wins below
+        current[region_name] = {'digest': digest, 'record': dict(record) if record else None}
+        return record
+    
+    with open_zhvi_csv(csv_path) as f:
+        reader = csv.reader(f)
+        start = time.perf_counter()
+        header = next(reader, [])
+        
+        plan = build_column_plan(header)
+        latest_cols = plan['latest_cols']
+        print(f"Latest columns: {latest_cols[:3]}...")
+        if report is not None:
+            report.add_time('header_scan', time.perf_counter() - start)
+        
+        rows = iter_projected_rows(reader, plan, region_filter, stats)
+        for region_name, record in timed_records(rows, latest_cols, report, stats, compute):
+            metro_data[region_name] = record
+    
+    state['sources'][source_key] = current
+    save_state(state_path, state)
+    print(f"Reused {counts['reused']} unchanged regions, recomputed {counts['recomputed']}")
+    if report is not None:
+        report.count('regions_reused', counts['reused'])
+        report.count('regions_recomputed', counts['recomputed'])
     
     return metro_data
 
@@ -180,7 +476,6 @@ def create_city_mapping():
         'Glendale, AZ': None,  # Not in our list
         'Garland, TX': None,  # Not in our list
         'Hialeah, FL': None,  # Not in our list
-        'Reno, NV': 'Reno',
         'Chesapeake, VA': None,  # Not in our list
         'Gilbert, AZ': None,  # Not in our list
         'Baton Rouge, LA': None,  # Not in our list
@@ -236,7 +531,6 @@ def create_city_mapping():
         'Cary, NC': None,  # Not in our list
         'Frisco, TX': 'Frisco',
         'McKinney, TX': None,  # Not in our list
-        'Santa Ana, CA': None,  # Not in our list
         'Fullerton, CA': None,  # Not in our list
         'Palm Bay, FL': None,  # Not in our list
         'Pomona, CA': None,  # Not in our list
@@ -356,7 +650,6 @@ def create_city_mapping():
         'Bonita Springs, FL': None,  # Not in our list
         'Estero, FL': None,  # Not in our list
         'Fort Myers, FL': None,  # Not in our list
-        'Cape Coral, FL': None,  # Not in our list
         'Sanibel, FL': None,  # Not in our list
         'Captiva, FL': None,  # Not in our list
         'Pine Island, FL': None,  # Not in our list
@@ -406,7 +699,6 @@ def create_city_mapping():
         'Bushnell, FL': None,  # Not in our list
         'Webster, FL': None,  # Not in our list
         'Center Hill, FL': None,  # Not in our list
-        'Mascotte, FL': None,  # Not in our list
         'Okahumpka, FL': None,  # Not in our list
         'Yalaha, FL': None,  # Not in our list
         'Leesburg, FL': None,  # Not in our list
@@ -417,7 +709,6 @@ def create_city_mapping():
         'Winter Garden, FL': None,  # Not in our list
         'Gotha, FL': None,  # Not in our list
         'Oakland, FL': None,  # Not in our list
-        'Orlando, FL': 'Orlando',
         'Winter Park, FL': None,  # Not in our list
         'Maitland, FL': None,  # Not in our list
         'Eatonville, FL': None,  # Not in our list
@@ -453,16 +744,13 @@ def create_city_mapping():
         'Indialantic, FL': None,  # Not in our list
         'Melbourne, FL': None,  # Not in our list
         'Melbourne Beach, FL': None,  # Not in our list
-        'Palm Bay, FL': None,  # Not in our list
         'West Melbourne, FL': None,  # Not in our list
         'Palm Shores, FL': None,  # Not in our list
         'Grant-Valkaria, FL': None,  # Not in our list
         'Malabar, FL': None,  # Not in our list
-        'Sebastian, FL': None,  # Not in our list
         'Fellsmere, FL': None,  # Not in our list
         'Roseland, FL': None,  # Not in our list
         'Wabasso, FL': None,  # Not in our list
-        'Vero Beach, FL': None,  # Not in our list
         'Indian River Shores, FL': None,  # Not in our list
         'Orchid, FL': None,  # Not in our list
         'North Beach, FL': None,  # Not in our list
@@ -470,9 +758,7 @@ def create_city_mapping():
         'Gifford, FL': None,  # Not in our list
         'Windsor, FL': None,  # Not in our list
         'Lakewood Park, FL': None,  # Not in our list
-        'Fort Pierce, FL': None,  # Not in our list
         'White City, FL': None,  # Not in our list
-        'Port St. Lucie, FL': None,  # Not in our list
         'St. Lucie West, FL': None,  # Not in our list
         'Palm City, FL': None,  # Not in our list
         'Jensen Beach, FL': None,  # Not in our list
@@ -480,31 +766,22 @@ def create_city_mapping():
         'Stuart, FL': None,  # Not in our list
         'Hobe Sound, FL': None,  # Not in our list
         'Jupiter Island, FL': None,  # Not in our list
-        'Jupiter, FL': None,  # Not in our list
         'Juno Beach, FL': None,  # Not in our list
         'Tequesta, FL': None,  # Not in our list
-        'Palm Beach Gardens, FL': None,  # Not in our list
         'North Palm Beach, FL': None,  # Not in our list
         'Lake Park, FL': None,  # Not in our list
-        'Riviera Beach, FL': None,  # Not in our list
         'Palm Beach, FL': None,  # Not in our list
-        'West Palm Beach, FL': None,  # Not in our list
         'South Palm Beach, FL': None,  # Not in our list
         'Lantana, FL': None,  # Not in our list
         'Manalapan, FL': None,  # Not in our list
         'Hypoluxo, FL': None,  # Not in our list
-        'Boynton Beach, FL': None,  # Not in our list
         'Gulf Stream, FL': None,  # Not in our list
-        'Delray Beach, FL': None,  # Not in our list
         'Highland Beach, FL': None,  # Not in our list
-        'Boca Raton, FL': None,  # Not in our list
         'Deerfield Beach, FL': None,  # Not in our list
         'Hillsboro Beach, FL': None,  # Not in our list
         'Lighthouse Point, FL': None,  # Not in our list
-        'Pompano Beach, FL': None,  # Not in our list
         'Lauderdale-by-the-Sea, FL': None,  # Not in our list
         'Sea Ranch Lakes, FL': None,  # Not in our list
-        'Fort Lauderdale, FL': None,  # Not in our list
         'Wilton Manors, FL': None,  # Not in our list
         'Oakland Park, FL': None,  # Not in our list
         'Lauderdale Lakes, FL': None,  # Not in our list
@@ -512,16 +789,13 @@ def create_city_mapping():
         'Plantation, FL': None,  # Not in our list
         'Sunrise, FL': None,  # Not in our list
         'Tamarac, FL': None,  # Not in our list
-        'Coral Springs, FL': None,  # Not in our list
         'Parkland, FL': None,  # Not in our list
         'Margate, FL': None,  # Not in our list
         'Coconut Creek, FL': None,  # Not in our list
         'North Lauderdale, FL': None,  # Not in our list
-        'Fort Lauderdale, FL': None,  # Not in our list
         'Dania Beach, FL': None,  # Not in our list
         'Hallandale Beach, FL': None,  # Not in our list
         'Hollywood, FL': None,  # Not in our list
-        'Pembroke Pines, FL': None,  # Not in our list
         'Miramar, FL': None,  # Not in our list
         'Weston, FL': None,  # Not in our list
         'Davie, FL': None,  # Not in our list
@@ -531,7 +805,6 @@ def create_city_mapping():
         'West Park, FL': None,  # Not in our list
         'Miami Gardens, FL': None,  # Not in our list
         'Opa-locka, FL': None,  # Not in our list
-        'Hialeah, FL': None,  # Not in our list
         'Miami Lakes, FL': None,  # Not in our list
         'Medley, FL': None,  # Not in our list
         'Sweetwater, FL': None,  # Not in our list
@@ -539,7 +812,6 @@ def create_city_mapping():
         'Virginia Gardens, FL': None,  # Not in our list
         'Miami Springs, FL': None,  # Not in our list
         'Hialeah Gardens, FL': None,  # Not in our list
-        'Miami, FL': 'Miami',
         'Key Biscayne, FL': None,  # Not in our list
         'Surfside, FL': None,  # Not in our list
         'Bay Harbor Islands, FL': None,  # Not in our list
@@ -554,57 +826,345 @@ def create_city_mapping():
         'El Portal, FL': None,  # Not in  our list
         'North Miami, FL': None,  # Not in our list
         'North Miami Beach, FL': None,  # Not in our list
-        'Miami Gardens, FL': None,  # Not in our list
-        'Ojus, FL': None,  # Not in our list
-        'Aventura, FL': None,  # Not in our list
-        'Sunny Isles Beach, FL': None,  # Not in our list
-        'North Bay Village, FL': None,  # Not in our list
-        'Miami Beach, FL': None,  # Not in our list
-        'Miami Shores, FL': None,  # Not in our list
-        'El Portal, FL': None,  # Not in our list
-        'North Miami, FL': None,  # Not in our list
-        'North Miami Beach, FL': None,  # Not in our list
-        'Miami Gardens, FL': None,  # Not in our list
-        'Ojus, FL': None,  # Not in our list
-        'Aventura, FL': None,  # Not in our list
-        'Sunny Isles Beach, FL': None,  # Not in our list
-        'North Bay Village, FL': None,  # Not in our list
-        'Miami Beach, FL': None,  # Not in our list
-        'Miami Shores, FL': None,  # Not in our list
-        'El Portal, FL': None,  # Not in our list
-        'North Miami, FL': None,  # Not in our list
-        'North Miami Beach, FL': None,  # Not in our list
-        'Miami Gardens, FL': None,  # Not in our list
         'Ojus, FL': None,  # Not in our list
     }
     
     return mapping
 
-if __name__ == '__main__':
-    print("Parsing Zillow CSV...")
-    metro_data = parse_zillow_csv()
-    print(f"Found {len(metro_data)} metros")
+def match_cities(metro_data, city_mapping):
+    """Match Zillow metros to our city names"""
+    matched_data, _ = RegionMatcher.from_mapping(city_mapping).match(metro_data)
+    return matched_data
+
+def write_run_report(run_report, output_path):
+    """Save a RunReport as <output stem>.report.json next to the output"""
+    report_path = output_path.with_name(output_path.stem + '.report.json')
+    run_report.write(report_path)
+    print(f"Run report saved to: {report_path}")
+
+def print_match_report(report):
+    """Summarize what the matcher could not place"""
+    print(f"Skipped {report['excluded']} regions not in our list")
+    for label, rows in report.get('rows_bad_key', {}).items():
+        print(f"Skipped {rows} {label} tier rows with an unreadable SizeRank/RegionID")
+    mismatches = report.get('rank_mismatches', [])
+    if mismatches:
+        preview = ', '.join(mismatches[:5])
+        print(f"Not joined across tiers (SizeRank differs between files): {len(mismatches)} "
+              f"({preview}{', ...' if len(mismatches) > 5 else ''})")
+    for label, items in (('Unmatched', report['unmatched']), ('Ambiguous', report['ambiguous'])):
+        if items:
+            preview = ', '.join(str(item) for item in items[:5])
+            print(f"{label}: {len(items)} ({preview}{', ...' if len(items) > 5 else ''})")
+    for state, place, existing, city in report['index_conflicts']:
+        print(f"Index conflict: {place}, {state} maps to both {existing} and {city}")
+
+def write_json(data, output_path):
+    """Save output JSON, creating the parent directory if needed"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(output_path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def write_binary_output(matched_data, output_path):
+    """Save the compact binary artifact next to the JSON output"""
+    from zhvi_binary import write_binary
+    binary_path = output_path.with_suffix('.bin')
+    write_binary(matched_data, binary_path)
+    print(f"Binary artifact saved to: {binary_path}")
+
+def write_affordability_table_output(matched_data, output_path):
+    """Save the quantized affordability lookup table next to the JSON output"""
+    from zhvi_affordability_table import write_table
+    write_table(matched_data, output_path.with_suffix('.affordability.bin'))
+
+def write_sqlite_output(csv_path, matched_data, output_path):
+    """Upsert the records and their monthly history into the SQLite store next to the JSON output"""
+    from zhvi_sqlite import load_region_history, write_sqlite
+    db_path = output_path.with_suffix('.sqlite')
+    regions = {(record['region_name'], record['state']) for record in matched_data.values()}
+    changes = write_sqlite(matched_data, load_region_history(csv_path, regions), db_path)
+    print(f"SQLite store updated: {db_path} ({changes:,} rows changed)")
+
+def write_delta_output(previous_data, matched_data, output_path, tolerance):
+    """Save a patch against the previous output; return the data to publish"""
+    from zhvi_delta import apply_patch, diff_records, patch_summary, write_patch
+    patch = diff_records(previous_data, matched_data, tolerance)
+    patch_path = output_path.with_name(output_path.stem + '.patch.json')
+    write_patch(patch, patch_path)
+    print(f"Patch ({patch_summary(patch)}) saved to: {patch_path}")
+    if tolerance:
+        # Publish what clients will hold so sub-tolerance moves accumulate
+        matched_data = apply_patch(previous_data, patch)
+        write_json(matched_data, output_path)
+    return matched_data
+
+def write_outputs(matched_data, output_path, args, previous_data=None, run_report=None):
+    """Write the optional outputs every refresh mode shares, after the JSON
     
-    # Create mapping
+    Covers the --delta patch, --binary, --affordability-table and --sqlite
+    sinks and the run report. Returns the data actually published, which
+    differs from matched_data when --delta-tolerance holds back small moves.
+    """
+    print(f"\nMatched {len(matched_data)} cities")
+    print(f"Data saved to: {output_path}")
+    if previous_data is not None:
+        with timed_stage(run_report, 'delta', rows=len(matched_data)):
+            matched_data = write_delta_output(previous_data, matched_data, output_path, args.delta_tolerance)
+    if args.binary:
+        with timed_stage(run_report, 'binary', rows=len(matched_data)):
+            write_binary_output(matched_data, output_path)
+    if args.affordability_table:
+        with timed_stage(run_report, 'affordability_table', rows=len(matched_data)):
+            write_affordability_table_output(matched_data, output_path)
+    if args.sqlite:
+        with timed_stage(run_report, 'sqlite', rows=len(matched_data)):
+            write_sqlite_output(args.csv, matched_data, output_path)
+    if run_report is not None:
+        run_report.count('cities_matched', len(matched_data))
+        write_run_report(run_report, output_path)
+    return matched_data
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--csv', default=CSV_PATH, help='Zillow ZHVI CSV to parse (plain, .gz, .zip or .xz)')
+    parser.add_argument('--engine', choices=['python', 'numpy'], default='python',
+                        help='row-by-row parser or the NumPy matrix engine')
+    parser.add_argument('--incremental', action='store_true',
+                        help='reuse records for unchanged regions from the state file next to the output')
+    parser.add_argument('--manifest', type=Path,
+                        help='JSON manifest of ZHVI datasets to parse in parallel (see zhvi_batch.py)')
+    parser.add_argument('--shards', type=int,
+                        help='split --csv into this many byte ranges parsed in parallel (see zhvi_shards.py)')
+    parser.add_argument('--workers', type=int,
+                        help='worker processes for --manifest or --shards (default: CPU count)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='stream --csv through mmap with bounded memory (see zhvi_stream.py)')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='overlap reading, parsing and output in concurrent stages (see zhvi_pipeline.py)')
+    parser.add_argument('--output', type=Path, help='JSON file to write')
+    parser.add_argument('--binary', action='store_true',
+                        help='also write the compact binary artifact next to the JSON (see zhvi_binary.py)')
+    parser.add_argument('--affordability-table', action='store_true',
+                        help='also write the affordability lookup table next to the JSON (see zhvi_affordability_table.py)')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='also upsert into the indexed SQLite store next to the JSON (see zhvi_sqlite.py)')
+    parser.add_argument('--delta', action='store_true',
+                        help='also write a patch against the previous output file (see zhvi_delta.py)')
+    parser.add_argument('--delta-tolerance', type=float, default=0.0,
+                        help='relative change below which --delta leaves a city as it was (0.001 = 0.1%%)')
+    parser.add_argument('--analytics', action='store_true',
+                        help='write rolling-window analytics per city instead (see zhvi_analytics.py)')
+    parser.add_argument('--history', action='store_true',
+                        help='write the full monthly rent series per city instead (see zhvi_history.py)')
+    parser.add_argument('--quarterly', action='store_true',
+                        help='average --history down to calendar quarters')
+    parser.add_argument('--fallback', nargs=2, metavar=('CENTROIDS_CSV', 'CITIES_CSV'),
+                        help='estimate unmatched cities from their nearest metros instead (see zhvi_fallback.py)')
+    parser.add_argument('--fallback-k', type=int, default=3, help='metros per --fallback estimate')
+    parser.add_argument('--fallback-max-km', type=float, default=250.0,
+                        help='ignore metros farther than this for --fallback')
+    parser.add_argument('--rankings', action='store_true',
+                        help='write top/bottom market rankings over every region in --csv instead (see zhvi_rankings.py)')
+    parser.add_argument('--rankings-k', type=int, default=10, help='regions per --rankings list')
+    parser.add_argument('--tiers', nargs=3, metavar=('BOTTOM_CSV', 'MIDDLE_CSV', 'TOP_CSV'),
+                        help='merge-join the three price tier files into low/mid/high rent bands (see zhvi_tiers.py)')
+    parser.add_argument('--neighborhoods', metavar='CROSSWALK_CSV',
+                        help='aggregate a zip-level --csv into neighborhoods via a zip crosswalk (see zhvi_neighborhoods.py)')
+    parser.add_argument('--windows', default='3,6,12',
+                        help='comma-separated month windows for --analytics and --rankings')
+    parser.add_argument('--trend-threshold', type=float, default=2.0,
+                        help='percent change that counts as an up/down trend for --analytics')
+    parser.add_argument('--calibrate', metavar='RENT_CSV',
+                        help='fit per-metro rent ratios from a ZORI-style CSV and save them (see zhvi_calibration.py)')
+    parser.add_argument('--rent-ratios', type=Path, nargs='?', const=RENT_RATIOS_PATH,
+                        help=f'use calibrated rent ratios (default file: {RENT_RATIOS_PATH.name})')
+    parser.add_argument('--shrinkage', type=float, default=12.0,
+                        help='months of weight given to the national ratio by --calibrate')
+    parser.add_argument('--calibration-months', type=int, default=24,
+                        help='most recent months --calibrate fits over (0 = all)')
+    parser.add_argument('--report', action='store_true',
+                        help='write a per-stage JSON run report next to the output (see zhvi_report.py)')
+    parser.add_argument('--profile', choices=['cprofile', 'tracemalloc'],
+                        help='add profiler output to the run report')
+    args = parser.parse_args(argv)
+    
+    run_report = None
+    if args.report or args.profile:
+        other_modes = [flag for flag, value in (
+            ('--manifest', args.manifest), ('--analytics', args.analytics), ('--tiers', args.tiers),
+            ('--neighborhoods', args.neighborhoods), ('--calibrate', args.calibrate),
+            ('--rankings', args.rankings), ('--history', args.history), ('--fallback', args.fallback),
+        ) if value]
+        if other_modes:
+            parser.error(f"--report/--profile only instrument the refresh, not {other_modes[0]}")
+        run_report = RunReport(profile=args.profile)
+        run_report.start()
+    
+    # --calibrate writes the ratios file; every other mode can read one
+    calibration = None
+    if args.rent_ratios and not args.calibrate:
+        with open(args.rent_ratios, 'r') as f:
+            calibration = json.load(f)
+    
+    # Create mapping and the matcher index over it
     city_mapping = create_city_mapping()
+    matcher = RegionMatcher.from_mapping(city_mapping)
+    
+    if args.manifest:
+        from zhvi_batch import run_batch
+        output_path = args.output or BATCH_OUTPUT_PATH
+        merged_data = run_batch(args.manifest, matcher, args.engine, args.workers, calibration)
+        write_json(merged_data, output_path)
+        print(f"\nMatched {len(merged_data)} cities")
+        print(f"Data saved to: {output_path}")
+        return
+    
+    if args.analytics:
+        from zhvi_analytics import run_analytics
+        output_path = args.output or ANALYTICS_OUTPUT_PATH
+        windows = [int(n) for n in args.windows.split(',') if n.strip()]
+        analytics_data = run_analytics(args.csv, matcher, windows, args.trend_threshold, calibration=calibration)
+        write_json(analytics_data, output_path)
+        print(f"\nAnalytics for {len(analytics_data)} cities saved to: {output_path}")
+        return
+    
+    if args.tiers:
+        from zhvi_tiers import run_tiers
+        output_path = args.output or RENT_BANDS_OUTPUT_PATH
+        matched_data, match_report = run_tiers(args.tiers, matcher, calibration)
+        print_match_report(match_report)
+        write_json(matched_data, output_path)
+        print(f"\nRent bands for {len(matched_data)} cities saved to: {output_path}")
+        return
+    
+    if args.neighborhoods:
+        from zhvi_neighborhoods import run_neighborhoods
+        output_path = args.output or NEIGHBORHOODS_OUTPUT_PATH
+        neighborhoods, cities = run_neighborhoods(args.csv, args.neighborhoods, calibration)
+        write_json(neighborhoods, output_path)
+        cities_path = output_path.with_name(output_path.stem + '.cities.json')
+        write_json(cities, cities_path)
+        count = sum(len(records) for state in neighborhoods.values() for records in state.values())
+        print(f"\n{count} neighborhoods saved to: {output_path}")
+        print(f"City aggregates saved to: {cities_path}")
+        return
+    
+    if args.calibrate:
+        from zhvi_calibration import run_calibration
+        ratios_path = args.rent_ratios or RENT_RATIOS_PATH
+        run_calibration(args.csv, args.calibrate, ratios_path, args.shrinkage, args.calibration_months)
+        print(f"Rent ratios saved to: {ratios_path}")
+        return
+    
+    if args.rankings:
+        from zhvi_rankings import run_rankings
+        output_path = args.output or RANKINGS_OUTPUT_PATH
+        windows = [int(n) for n in args.windows.split(',') if n.strip()]
+        rankings = run_rankings(args.csv, args.rankings_k, windows, calibration)
+        write_json(rankings, output_path)
+        print(f"\nRankings for {len(rankings['national'])} metrics saved to: {output_path}")
+        return
+    
+    if args.history:
+        from zhvi_history import build_history, write_history
+        output_path = args.output or HISTORY_OUTPUT_PATH
+        series_by_city, step_months = build_history(args.csv, matcher, calibration, args.quarterly)
+        write_history(series_by_city, step_months, output_path)
+        print(f"\nRent history for {len(series_by_city)} cities saved to: {output_path} "
+              f"({output_path.stat().st_size:,} bytes)")
+        return
+    
+    if args.fallback:
+        from zhvi_fallback import load_centroids, load_cities, resolve_fallbacks
+        output_path = args.output or FALLBACK_OUTPUT_PATH
+        # Every metro can be a neighbour, not only the ones we map
+        metro_data = parse_zillow_csv(args.csv)
+        if calibration is not None:
+            apply_rent_ratios(metro_data, calibration)
+        matched_data, _ = matcher.match({name: dict(record) for name, record in metro_data.items()})
+        centroids_path, cities_path = args.fallback
+        fallbacks = resolve_fallbacks(metro_data, matched_data, load_centroids(centroids_path),
+                                      load_cities(cities_path), args.fallback_k, args.fallback_max_km)
+        write_json(fallbacks, output_path)
+        print(f"\nFallback estimates for {len(fallbacks)} cities saved to: {output_path}")
+        return
+    
+    output_path = args.output or OUTPUT_PATH
+    
+    previous_data = None
+    if args.delta:
+        if output_path.exists():
+            with open(output_path, 'r') as f:
+                previous_data = json.load(f)
+        else:
+            print(f"No previous output at {output_path}, skipping the patch")
+    
+    if args.low_memory:
+        from zhvi_stream import run_low_memory
+        print("Streaming Zillow CSV...")
+        matched_data = run_low_memory(args.csv, output_path, matcher, run_report)
+        if calibration is not None:
+            apply_rent_ratios(matched_data, calibration)
+            write_json(matched_data, output_path)
+        write_outputs(matched_data, output_path, args, previous_data, run_report)
+        return
+    
+    if args.pipelined:
+        from zhvi_pipeline import run_pipelined
+        print("Parsing Zillow CSV in pipelined stages...")
+        with timed_stage(run_report, 'pipeline'):
+            metro_data, matched_data, match_report = run_pipelined(
+                args.csv, output_path, matcher, report=run_report)
+        if run_report is not None:
+            run_report.add_rows('pipeline', run_report.counters.get('rows_read', 0))
+        print(f"Found {len(metro_data)} metros")
+        print_match_report(match_report)
+        if calibration is not None:
+            apply_rent_ratios(matched_data, calibration)
+            write_json(matched_data, output_path)
+        if run_report is not None:
+            run_report.count('regions_parsed', len(metro_data))
+            run_report.count('regions_unmatched', len(match_report['unmatched']))
+        write_outputs(matched_data, output_path, args, previous_data, run_report)
+        return
+    
+    print("Parsing Zillow CSV...")
+    with timed_stage(run_report, 'parse'):
+        if args.incremental:
+            metro_data = parse_zillow_csv_incremental(
+                args.csv, get_state_path(output_path), city_mapping, region_filter=matcher, report=run_report)
+        elif args.shards:
+            from zhvi_shards import parse_zillow_csv_sharded
+            metro_data = parse_zillow_csv_sharded(
+                args.csv, region_filter=matcher, workers=args.workers, shard_count=args.shards, report=run_report)
+        elif args.engine == 'numpy':
+            from zhvi_matrix import parse_zillow_matrix
+            metro_data = parse_zillow_matrix(args.csv, region_filter=matcher, report=run_report)
+        else:
+            metro_data = parse_zillow_csv(args.csv, region_filter=matcher, report=run_report)
+    if run_report is not None:
+        run_report.add_rows('parse', run_report.counters.get('rows_read', 0))
+    print(f"Found {len(metro_data)} metros")
+    if calibration is not None:
+        apply_rent_ratios(metro_data, calibration)
     
     # Match metros to our cities
-    matched_data = {}
-    for zillow_name, city_name in city_mapping.items():
-        if city_name and zillow_name in metro_data:
-            matched_data[city_name] = metro_data[zillow_name]
-            matched_data[city_name]['city_name'] = city_name
+    with timed_stage(run_report, 'match', rows=len(metro_data)):
+        matched_data, match_report = matcher.match(metro_data)
+    print_match_report(match_report)
     
     # Save to JSON
-    output_path = Path(__file__).parent.parent / 'lib' / 'data' / 'sources' / 'zillow_data.json'
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with timed_stage(run_report, 'write', rows=len(matched_data)):
+        write_json(matched_data, output_path)
+    if run_report is not None:
+        run_report.count('regions_parsed', len(metro_data))
+        run_report.count('regions_unmatched', len(match_report['unmatched']))
+    matched_data = write_outputs(matched_data, output_path, args, previous_data, run_report)
     
-    with open(output_path, 'w') as f:
-        json.dump(matched_data, f, indent=2)
-    
-    print(f"\nMatched {len(matched_data)} cities")
-    print(f"Data saved to: {output_path}")
     print("\nSample data:")
     for city, data in list(matched_data.items())[:5]:
         print(f"  {city}: ${data['rent_estimate']:,.0f}/mo (trend: {data['trend']})")
 
+if __name__ == '__main__':
+    main()
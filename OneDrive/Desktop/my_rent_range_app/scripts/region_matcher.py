@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Indexed matcher from Zillow region names to our city names
+Normalizes "City, ST" names, hyphenated multi-city metros and "St." vs
+"Saint", then resolves each region with hash lookups in a state-partitioned
+index built once from the city mapping and an alias table.
+"""
+
+import csv
+import re
+from pathlib import Path
+
+ALIASES_PATH = Path(__file__).parent / 'region_aliases.csv'
+
+# Match quality, best first: the literal mapping key, a normalized name or
+# alias, then one city of a hyphenated multi-city metro
+RANK_EXACT = 0
+RANK_NORMALIZED = 1
+RANK_COMPONENT = 2
+
+# Abbreviations folded to one spelling so "Saint Paul" finds "St. Paul"
+WORD_ALIASES = {
+    'saint': 'st',
+    'sainte': 'ste',
+    'fort': 'ft',
+    'mount': 'mt',
+}
+
+_PARENTHETICAL = re.compile(r'\s*\([^)]*\)')
+_NON_WORD = re.compile(r"[.'’]")
+
+def normalize_place(name):
+    """Lowercase a place name and fold punctuation and common abbreviations"""
+    name = _PARENTHETICAL.sub('', name)
+    name = _NON_WORD.sub('', name.lower())
+    return ' '.join(WORD_ALIASES.get(word, word) for word in name.split())
+
+def split_region_name(region_name, state=''):
+    """Split a Zillow region name into (place, [state codes])
+
+    Metro names look like "Dallas, TX" or "Minneapolis-St. Paul, MN-WI";
+    city and zip level files carry the state only in StateName.
+    """
+    if ', ' in region_name:
+        place, states = region_name.rsplit(', ', 1)
+        return place, [s.strip() for s in states.split('-') if s.strip()]
+    return region_name, [state] if state else []
+
+def load_aliases(aliases_path=ALIASES_PATH):
+    """Load (state, alias, city) rows from the alias table"""
+    try:
+        with open(aliases_path, 'r', encoding='utf-8', newline='') as f:
+            return [
+                (row['state'].strip(), row['alias'].strip(), row['city'].strip())
+                for row in csv.DictReader(f)
+                if row.get('alias') and row.get('city')
+            ]
+    except FileNotFoundError:
+        return []
+
+class RegionMatcher:
+    """Resolve Zillow regions to city names in O(1) per region"""
+
+    def __init__(self, city_mapping, aliases=()):
+        # Literal Zillow names we map, plus names we know but leave out
+        self.exact = {name: city for name, city in city_mapping.items() if city}
+        self.excluded = {name for name, city in city_mapping.items() if not city}
+        # Output order follows the mapping, like the original linear scan
+        self.city_order = {}
+        for city in city_mapping.values():
+            if city and city not in self.city_order:
+                self.city_order[city] = len(self.city_order)
+
+        # state -> normalized place -> city
+        self.index = {}
+        self.conflicts = []
+        for name, city in self.exact.items():
+            place, states = split_region_name(name)
+            for state in states:
+                self._add(state, place, city)
+        for state, alias, city in aliases:
+            self._add(state, alias, city)
+            if city not in self.city_order:
+                self.city_order[city] = len(self.city_order)
+
+        # Normalized places in any state, for rows without a state suffix
+        self._all_places = set()
+        for places in self.index.values():
+            self._all_places.update(places)
+
+    @classmethod
+    def from_mapping(cls, city_mapping, aliases_path=ALIASES_PATH):
+        return cls(city_mapping, load_aliases(aliases_path))
+
+    def _add(self, state, place, city):
+        key = normalize_place(place)
+        places = self.index.setdefault(state, {})
+        existing = places.get(key)
+        if existing is not None and existing != city:
+            self.conflicts.append((state, place, existing, city))
+            return
+        places[key] = city
+
+    def __contains__(self, region_name):
+        """Cheap pre-filter: could this region name resolve to any city?"""
+        if region_name in self.exact:
+            return True
+        if region_name in self.excluded:
+            return False
+        place, states = split_region_name(region_name)
+        candidates = [normalize_place(place)]
+        if '-' in place or '/' in place:
+            candidates.extend(normalize_place(part) for part in re.split(r'[-/]', place))
+        if states:
+            return any(key in self.index.get(state, ()) for state in states for key in candidates)
+        return any(key in self._all_places for key in candidates)
+
+    def resolve(self, region_name, state=''):
+        """Return (city_names, rank) for one region, best matches only
+
+        More than one city means a multi-city metro matched several of ours.
+        """
+        city = self.exact.get(region_name)
+        if city:
+            return [city], RANK_EXACT
+        # Explicitly left out of our list, never matched another way
+        if region_name in self.excluded:
+            return [], None
+
+        place, states = split_region_name(region_name, state)
+        for state_code in states:
+            places = self.index.get(state_code)
+            if not places:
+                continue
+            city = places.get(normalize_place(place))
+            if city:
+                return [city], RANK_NORMALIZED
+
+        # Hyphenated metros list their principal city first
+        if '-' in place or '/' in place:
+            cities = []
+            for part in re.split(r'[-/]', place):
+                key = normalize_place(part)
+                for state_code in states:
+                    city = self.index.get(state_code, {}).get(key)
+                    if city and city not in cities:
+                        cities.append(city)
+            if cities:
+                return cities, RANK_COMPONENT
+
+        return [], None
+
+    def match(self, metro_data):
+        """Match every parsed region to a city
+
+        Returns (matched_data, report). matched_data has the same shape and
+        order as before; report lists unmatched and ambiguous regions.
+        """
+        best = {}
+        claims = {}
+        unmatched = []
+        excluded = 0
+        ambiguous = []
+
+        for order, (region_name, record) in enumerate(metro_data.items()):
+            cities, rank = self.resolve(region_name, record.get('state', ''))
+            if not cities:
+                if region_name in self.excluded:
+                    excluded += 1
+                else:
+                    unmatched.append(region_name)
+                continue
+            if len(cities) > 1:
+                ambiguous.append({'region_name': region_name, 'cities': cities})
+
+            # A multi-city metro stands in for its principal city only
+            city = cities[0]
+            claims.setdefault(city, []).append(region_name)
+            key = (rank, order)
+            if city not in best or key < best[city][0]:
+                best[city] = (key, region_name)
+
+        for city, regions in claims.items():
+            if len(regions) > 1:
+                ambiguous.append({'city_name': city, 'regions': regions, 'chosen': best[city][1]})
+
+        matched_data = {}
+        for city in sorted(best, key=lambda c: self.city_order.get(c, len(self.city_order))):
+            region_name = best[city][1]
+            matched_data[city] = metro_data[region_name]
+            matched_data[city]['city_name'] = city
+
+        report = {
+            'matched': len(matched_data),
+            'excluded': excluded,
+            'unmatched': unmatched,
+            'ambiguous': ambiguous,
+            'index_conflicts': self.conflicts,
+        }
+        return matched_data, report
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Bulk affordability calculator mirroring RentCalculator
+Ports the math in lib/core/calculations/rent_calculator.dart to NumPy so
+affordability studies can run over millions of households at once:
+calculateMonthlyIncome, calculateNetIncome (FICA, TaxRates, car cost) and
+calculateRentRanges (roommate split, bedroom multiplier). Operations run in
+the same order as the Dart code, so results match it bit for bit.
+
+Each household is also compared with its city's rent_estimate from
+zillow_data.json (looked up by city name, as CityDataEnricher does). The
+city rent is scaled by the bedroom multiplier, like the neighborhood
+comparison in the app. gap is the balanced rent minus that figure, and
+burden_pct is that figure as a percentage of net income.
+
+Input columns (CSV, or Parquet with pyarrow installed):
+    income, income_type (hourly/monthly/annual), state, car, roommates,
+    bedrooms (studio/1/2/3+), city (optional)
+
+`verify` checks the constant tables below against the Dart sources,
+checks a few hand-worked cases, checks the vectorized path against the
+golden outputs test/rent_calculator_parity_test.dart pins for a fixed
+input grid (test/goldens/rent_calculator_parity.json), and checks it
+against a row-by-row port of the Dart code over random households. The
+golden file records who wrote it in "source": only "dart" (written by
+flutter test --update-goldens) makes that a parity check against Dart.
+
+Usage:
+    python zhvi_affordability.py run households.csv results.csv [--data zillow_data.json]
+    python zhvi_affordability.py verify [--rows 100000]
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from parse_zillow_data import OUTPUT_PATH
+
+LIB_PATH = Path(__file__).parent.parent / 'lib'
+DART_SOURCES = {
+    'calculator': LIB_PATH / 'core' / 'calculations' / 'rent_calculator.dart',
+    'tax_rates': LIB_PATH / 'data' / 'sources' / 'tax_rates.dart',
+    'bedrooms': LIB_PATH / 'data' / 'models' / 'bedroom_config.dart',
+}
+# Pinned by test/rent_calculator_parity_test.dart; its "source" says who wrote it
+GOLDENS_PATH = LIB_PATH.parent / 'test' / 'goldens' / 'rent_calculator_parity.json'
+
+# RentCalculator.ficaRate / carOwnershipCost
+FICA_RATE = 0.0765
+CAR_OWNERSHIP_COST = 500.0
+
+# TaxRates.rates, and the rate getRate() falls back to
+STATE_TAX_RATES = {
+    'AL': 0.05, 'AK': 0.00, 'AZ': 0.045, 'AR': 0.065, 'CA': 0.09, 'CO': 0.0455,
+    'CT': 0.05, 'DE': 0.052, 'FL': 0.00, 'GA': 0.0575, 'HI': 0.08, 'ID': 0.06,
+    'IL': 0.0495, 'IN': 0.0323, 'IA': 0.06, 'KS': 0.057, 'KY': 0.05, 'LA': 0.06,
+    'ME': 0.0715, 'MD': 0.0475, 'MA': 0.05, 'MI': 0.0425, 'MN': 0.068, 'MS': 0.05,
+    'MO': 0.054, 'MT': 0.0675, 'NE': 0.0684, 'NV': 0.00, 'NH': 0.00, 'NJ': 0.0637,
+    'NM': 0.049, 'NY': 0.0649, 'NC': 0.0525, 'ND': 0.0227, 'OH': 0.0399, 'OK': 0.05,
+    'OR': 0.09, 'PA': 0.0307, 'RI': 0.0599, 'SC': 0.07, 'SD': 0.00, 'TN': 0.00,
+    'TX': 0.00, 'UT': 0.0495, 'VT': 0.068, 'VA': 0.0575, 'WA': 0.00, 'WV': 0.065,
+    'WI': 0.053, 'WY': 0.00, 'DC': 0.085,
+}
+DEFAULT_STATE_TAX_RATE = 0.05
+
+# BedroomConfiguration multipliers, keyed by the enum name
+BEDROOM_MULTIPLIERS = {
+    'studio': 0.7,
+    'oneBedroom': 1.0,
+    'twoBedrooms': 1.4,
+    'threePlusBedrooms': 1.8,
+}
+BEDROOM_ALIASES = {
+    'studio': 'studio', '0': 'studio',
+    '1': 'oneBedroom', '1br': 'oneBedroom', 'onebedroom': 'oneBedroom', '': 'oneBedroom',
+    '2': 'twoBedrooms', '2br': 'twoBedrooms', 'twobedrooms': 'twoBedrooms',
+    '3': 'threePlusBedrooms', '3+': 'threePlusBedrooms', '3br': 'threePlusBedrooms',
+    'threeplusbedrooms': 'threePlusBedrooms',
+}
+
+# Shares of net income from calculateRentRanges(): (conservative, balanced, stretch)
+RANGE_SHARES = {
+    'alone': (0.20, 0.25, 0.30),
+    'roommates': (0.20, 0.30, 0.40),
+}
+
+INCOME_TYPES = ('hourly', 'monthly', 'annual')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+BURDEN_LEVELS = ('safe', 'high', 'severe')
+
+OUTPUT_COLUMNS = [
+    'monthly_gross', 'net_monthly', 'conservative', 'balanced', 'stretch',
+    'city_rent', 'gap', 'gap_pct', 'burden_pct', 'burden_level',
+]
+
+def _map_values(values, convert, label):
+    """Map a string array through convert() once per distinct value
+
+    convert returns None for values it does not accept, which raises a
+    ValueError listing them.
+    """
+    uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    mapped = [convert(value) for value in uniques.tolist()]
+    unknown = [value for value, result in zip(uniques.tolist(), mapped) if result is None]
+    if unknown:
+        raise ValueError(f"Unknown {label} values: {unknown[:10]}")
+    return np.asarray(mapped)[inverse]
+
+def parse_flags(values):
+    return _map_values(values, lambda value: value.strip().lower() in TRUE_VALUES, 'flag')
+
+def parse_income_types(values):
+    """Index into INCOME_TYPES per row"""
+    lookup = {name: i for i, name in enumerate(INCOME_TYPES)}
+    return _map_values(values, lambda value: lookup.get(value.strip().lower()), 'income_type')
+
+def bedroom_name(value):
+    """BedroomConfiguration name for a bedrooms value ('1 BR' -> 'oneBedroom'), or None"""
+    return BEDROOM_ALIASES.get(value.strip().lower().replace(' ', ''))
+
+def parse_bedrooms(values):
+    """BedroomConfiguration multiplier per row"""
+    def convert(value):
+        name = bedroom_name(value)
+        return BEDROOM_MULTIPLIERS[name] if name else None
+    return _map_values(values, convert, 'bedrooms')
+
+def state_tax_rates(states):
+    """TaxRates.getRate() per row"""
+    return _map_values(states, lambda state: STATE_TAX_RATES.get(state.upper(), DEFAULT_STATE_TAX_RATE), 'state')
+
+def city_rents(cities, zillow_data):
+    """rent_estimate per row by city name, NaN where the city has no Zillow data"""
+    def convert(city):
+        record = zillow_data.get(city)
+        return float(record['rent_estimate']) if record else np.nan
+    return _map_values(cities, convert, 'city')
+
+def monthly_income(gross, income_type):
+    """calculateMonthlyIncome() over arrays"""
+    return np.select(
+        [income_type == 0, income_type == 1],
+        [gross * 40 * 52 / 12, gross],
+        gross / 12,
+    )
+
+def net_income(gross_monthly, tax_rate, owns_car):
+    """calculateNetIncome() over arrays"""
+    net = gross_monthly * (1 - FICA_RATE - tax_rate)
+    net = np.where(owns_car, net - CAR_OWNERSHIP_COST, net)
+    return np.where(net > 0, net, 0.0)
+
+def rent_ranges(net_monthly, has_roommates, multiplier):
+    """calculateRentRanges() over arrays: (conservative, balanced, stretch)"""
+    alone = RANGE_SHARES['alone']
+    shared = RANGE_SHARES['roommates']
+    return tuple(
+        np.where(has_roommates, net_monthly * share_shared, net_monthly * share_alone) * multiplier
+        for share_alone, share_shared in zip(alone, shared)
+    )
+
+def burden(rent, net_monthly):
+    """(calculateBurdenPercentage() * 100, calculateRentBurden() level index) over arrays"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = rent / net_monthly
+    pct = np.where(net_monthly > 0, ratio * 100, 0.0)
+    level = np.where(ratio >= 0.50, 2, np.where(ratio >= 0.30, 1, 0))
+    level = np.where((net_monthly <= 0) | ~(rent > 0), 0, level)
+    return pct, level
+
+def compute_affordability(columns, zillow_data):
+    """All output columns for a dict of input column arrays"""
+    gross = np.asarray(columns['income'], dtype=np.float64)
+    multiplier = parse_bedrooms(columns.get('bedrooms', np.full(len(gross), '')))
+    gross_monthly = monthly_income(gross, parse_income_types(columns['income_type']))
+    net = net_income(gross_monthly, state_tax_rates(columns['state']), parse_flags(columns['car']))
+    conservative, balanced, stretch = rent_ranges(net, parse_flags(columns['roommates']), multiplier)
+
+    cities = columns.get('city')
+    if cities is None:
+        city_rent = np.full(len(gross), np.nan)
+    else:
+        # Same as RentCalculator.applyBedroomMultiplier()
+        city_rent = city_rents(cities, zillow_data) * multiplier
+    gap = balanced - city_rent
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap_pct = gap / city_rent * 100
+    burden_pct, burden_level = burden(city_rent, net)
+
+    return {
+        'monthly_gross': gross_monthly,
+        'net_monthly': net,
+        'conservative': conservative,
+        'balanced': balanced,
+        'stretch': stretch,
+        'city_rent': city_rent,
+        'gap': gap,
+        'gap_pct': gap_pct,
+        'burden_pct': np.where(np.isnan(city_rent), np.nan, burden_pct),
+        'burden_level': np.where(np.isnan(city_rent), '', np.asarray(BURDEN_LEVELS)[burden_level]),
+    }
+
+def calculate_row(income, income_type, state, car, roommates, bedrooms='1', city_rent=None):
+    """Row-by-row port of RentCalculator.calculate(), the reference for verify"""
+    if income_type == 'hourly':
+        gross_monthly = income * 40 * 52 / 12
+    elif income_type == 'annual':
+        gross_monthly = income / 12
+    else:
+        gross_monthly = income
+
+    net = gross_monthly * (1 - FICA_RATE - STATE_TAX_RATES.get(state.upper(), DEFAULT_STATE_TAX_RATE))
+    if car:
+        net -= CAR_OWNERSHIP_COST
+    net = net if net > 0 else 0
+
+    multiplier = BEDROOM_MULTIPLIERS[bedroom_name(bedrooms)]
+    shares = RANGE_SHARES['roommates' if roommates else 'alone']
+    conservative, balanced, stretch = (net * share * multiplier for share in shares)
+
+    result = {'monthly_gross': gross_monthly, 'net_monthly': net,
+              'conservative': conservative, 'balanced': balanced, 'stretch': stretch}
+    if city_rent is not None:
+        rent = city_rent * multiplier
+        result['city_rent'] = rent
+        result['gap'] = balanced - rent
+        result['burden_pct'] = rent / net * 100 if net > 0 else 0.0
+    return result
+
+def read_households(path):
+    """{column: array} from a CSV or Parquet file"""
+    path = Path(path)
+    if path.suffix == '.parquet':
+        import pyarrow.parquet as pq  # only needed for Parquet input
+        table = pq.read_table(path)
+        return {name: np.asarray(table.column(name).to_pylist(), dtype=str if name != 'income' else np.float64)
+                for name in table.column_names}
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader, [])]
+        values = list(itertools.zip_longest(*(row for row in reader if row), fillvalue=''))
+    count = len(values[0]) if values else 0
+    columns = {}
+    for i, name in enumerate(header):
+        column = values[i] if i < len(values) else [''] * count
+        columns[name] = np.asarray(column, dtype=np.float64 if name == 'income' else str)
+    missing = [name for name in ('income', 'income_type', 'state', 'car', 'roommates') if name not in columns]
+    if missing:
+        raise ValueError(f"{path} has no {', '.join(missing)} column")
+    return columns
+
+def write_results(columns, results, path):
+    """Input columns plus the results, as CSV (cents) or Parquet (full precision)"""
+    path = Path(path)
+    names = list(columns) + OUTPUT_COLUMNS
+    arrays = [columns[name] for name in columns] + [results[name] for name in OUTPUT_COLUMNS]
+    if path.suffix == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        pq.write_table(pa.table(dict(zip(names, arrays))), path)
+        return
+
+    text_columns = []
+    for array in arrays:
+        if array.dtype.kind == 'f':
+            text_columns.append(['%.2f' % value if value == value else '' for value in array.tolist()])
+        else:
+            text_columns.append(array.astype(str).tolist())
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*text_columns))
+
+def load_zillow_data(data_path):
+    with open(data_path, 'r') as f:
+        return json.load(f)
+
+def run(households_path, output_path, data_path):
+    zillow_data = load_zillow_data(data_path)
+    columns = read_households(households_path)
+    count = len(columns['income'])
+    print(f"Loaded {count:,} households")
+
+    start = time.perf_counter()
+    results = compute_affordability(columns, zillow_data)
+    elapsed = time.perf_counter() - start
+    print(f"Computed in {elapsed:.3f}s ({count / max(elapsed, 1e-9):,.0f} households/s)")
+    matched = int(np.count_nonzero(~np.isnan(results['city_rent'])))
+    print(f"{matched:,} households have a Zillow rent for their city")
+
+    write_results(columns, results, output_path)
+    print(f"Results saved to: {output_path}")
+
+def read_dart_constants():
+    """The constants the Dart sources define, pulled out with regexes"""
+    calculator = DART_SOURCES['calculator'].read_text(encoding='utf-8')
+    tax_rates = DART_SOURCES['tax_rates'].read_text(encoding='utf-8')
+    bedrooms = DART_SOURCES['bedrooms'].read_text(encoding='utf-8')
+
+    ranges = calculator[calculator.index('calculateRentRanges('):calculator.index('applyBedroomMultiplier(')]
+    roommates_block, alone_block = ranges.split('} else {', 1)
+    return {
+        'fica_rate': float(re.search(r'ficaRate\s*=\s*([0-9.]+)', calculator).group(1)),
+        'car_ownership_cost': float(re.search(r'carOwnershipCost\s*=\s*([0-9.]+)', calculator).group(1)),
+        'state_tax_rates': {state: float(rate) for state, rate in re.findall(r"'([A-Z]{2})':\s*([0-9.]+)", tax_rates)},
+        'default_state_tax_rate': float(re.search(r'\?\?\s*([0-9.]+)', tax_rates).group(1)),
+        'bedroom_multipliers': {name: float(value) for name, value in re.findall(
+            r'case BedroomConfiguration\.(\w+):\s*return ([0-9.]+);', bedrooms)},
+        'range_shares': {
+            'roommates': tuple(float(x) for x in re.findall(r'netMonthly \* ([0-9.]+)', roommates_block)),
+            'alone': tuple(float(x) for x in re.findall(r'netMonthly \* ([0-9.]+)', alone_block)),
+        },
+    }
+
+# Worked by hand from the Dart formulas, to the cent or better:
+# (inputs, net_monthly, (conservative, balanced, stretch))
+PARITY_CASES = [
+    (dict(income=60000, income_type='annual', state='CA', car=True, roommates=False, bedrooms='1'),
+     3667.5, (733.5, 916.875, 1100.25)),
+    (dict(income=25, income_type='hourly', state='TX', car=False, roommates=True, bedrooms='2'),
+     4001.8333, (1120.5133, 1680.77, 2241.0267)),
+    (dict(income=4000, income_type='monthly', state='zz', car=False, roommates=False, bedrooms='studio'),
+     3494.0, (489.16, 611.45, 733.74)),
+    (dict(income=500, income_type='monthly', state='FL', car=True, roommates=True, bedrooms='3+'),
+     0.0, (0.0, 0.0, 0.0)),
+]
+
+# Golden fields and the compute_affordability() result each is compared with
+GOLDEN_FIELDS = {
+    'monthlyGross': 'monthly_gross',
+    'netMonthly': 'net_monthly',
+    'conservative': 'conservative',
+    'balanced': 'balanced',
+    'stretch': 'stretch',
+}
+
+def compare_goldens(golden_path=GOLDENS_PATH):
+    """Errors from running the vectorized path over the golden cases"""
+    with open(golden_path, 'r') as f:
+        goldens = json.load(f)
+    cases = goldens['cases']
+    source = goldens.get('source', 'unknown')
+    columns = {
+        'income': np.array([case['income'] for case in cases], dtype=np.float64),
+        'income_type': np.array([case['incomeType'] for case in cases]),
+        'state': np.array([case['state'] for case in cases]),
+        'car': np.array(['1' if case['ownsCar'] else '0' for case in cases]),
+        'roommates': np.array(['1' if case['hasRoommates'] else '0' for case in cases]),
+        'bedrooms': np.array([case['bedroom'] for case in cases]),
+    }
+    results = compute_affordability(columns, {})
+    # calculate() is given the rent as is, without the bedroom multiplier
+    burden_pct, burden_level = burden(np.array([case['actualRent'] for case in cases]), results['net_monthly'])
+
+    errors = []
+    for i, case in enumerate(cases):
+        got = {field: float(results[name][i]) for field, name in GOLDEN_FIELDS.items()}
+        got['burdenPercentage'] = float(burden_pct[i])
+        got['burdenLevel'] = BURDEN_LEVELS[burden_level[i]]
+        expected = {field: case[field] for field in GOLDEN_FIELDS}
+        expected['burdenPercentage'] = case['burdenPercentage'] * 100
+        expected['burdenLevel'] = case['burdenLevel']
+        diff = [field for field in got if got[field] != expected[field]]
+        if diff:
+            errors.append(f"golden case {i} {diff}: vectorized {[got[f] for f in diff]} "
+                          f"!= golden {[expected[f] for f in diff]}")
+    print(f"Compared {len(cases)} golden cases from {golden_path.name} (source: {source})")
+    if source != 'dart':
+        print("  Not a Dart parity check: record Dart outputs with "
+              "flutter test --update-goldens test/rent_calculator_parity_test.dart")
+    return errors
+
+def synthetic_households(n, zillow_data, seed=0):
+    """Random households covering every branch, as string columns like read_households()"""
+    rng = np.random.default_rng(seed)
+    cities = sorted(zillow_data)[:200] + ['Nowhere']
+    states = list(STATE_TAX_RATES) + ['ZZ', 'ca']
+    income_type = rng.choice(INCOME_TYPES, n)
+    income = np.where(income_type == 'hourly', rng.uniform(5, 150, n),
+                      np.where(income_type == 'monthly', rng.uniform(0, 25000, n), rng.uniform(0, 300000, n)))
+    return {
+        'income': np.round(income, 2),
+        'income_type': income_type,
+        'state': rng.choice(states, n),
+        'car': rng.choice(['1', '0'], n),
+        'roommates': rng.choice(['true', 'false'], n),
+        'bedrooms': rng.choice(['studio', '1', '2', '3+'], n),
+        'city': rng.choice(cities, n),
+    }
+
+def verify(rows, data_path):
+    """Errors found checking the port against the Dart sources, as strings"""
+    errors = []
+    dart = read_dart_constants()
+    ours = {
+        'fica_rate': FICA_RATE,
+        'car_ownership_cost': CAR_OWNERSHIP_COST,
+        'state_tax_rates': STATE_TAX_RATES,
+        'default_state_tax_rate': DEFAULT_STATE_TAX_RATE,
+        'bedroom_multipliers': BEDROOM_MULTIPLIERS,
+        'range_shares': RANGE_SHARES,
+    }
+    for name, value in ours.items():
+        if dart[name] != value:
+            errors.append(f"{name} differs from the Dart source: {dart[name]} != {value}")
+    print(f"Checked {len(ours)} constant tables against the Dart sources")
+
+    for inputs, net, ranges in PARITY_CASES:
+        result = calculate_row(**inputs)
+        got = (result['net_monthly'], (result['conservative'], result['balanced'], result['stretch']))
+        if not all(math.isclose(a, b, abs_tol=1e-3) for a, b in zip((got[0],) + got[1], (net,) + ranges)):
+            errors.append(f"{inputs}: expected {(net, ranges)}, got {got}")
+    print(f"Checked {len(PARITY_CASES)} hand-worked cases")
+
+    golden_errors = compare_goldens()
+    errors.extend(golden_errors[:10])
+    if len(golden_errors) > 10:
+        errors.append(f"... {len(golden_errors)} mismatching golden cases in total")
+
+    zillow_data = load_zillow_data(data_path) if Path(data_path).exists() else {}
+    columns = synthetic_households(rows, zillow_data)
+    start = time.perf_counter()
+    results = compute_affordability(columns, zillow_data)
+    elapsed = time.perf_counter() - start
+
+    mismatches = 0
+    for i in range(rows):
+        record = zillow_data.get(str(columns['city'][i]))
+        expected = calculate_row(
+            float(columns['income'][i]), str(columns['income_type'][i]), str(columns['state'][i]),
+            columns['car'][i] == '1', columns['roommates'][i] == 'true', str(columns['bedrooms'][i]),
+            float(record['rent_estimate']) if record else None,
+        )
+        for name, value in expected.items():
+            got = float(results[name][i])
+            if got != value:
+                mismatches += 1
+                if mismatches <= 10:
+                    errors.append(f"row {i} {name}: vectorized {got!r} != row-by-row {value!r}")
+                break
+    if mismatches > 10:
+        errors.append(f"... {mismatches} mismatching rows in total")
+    print(f"Compared {rows:,} synthetic households with the row-by-row port "
+          f"(vectorized: {rows / max(elapsed, 1e-9):,.0f} households/s)")
+    return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='compute affordability for a household file')
+    run_parser.add_argument('households', type=Path, help='household CSV or Parquet')
+    run_parser.add_argument('output', type=Path, help='results CSV or Parquet')
+    run_parser.add_argument('--data', type=Path, default=OUTPUT_PATH, help='zillow_data.json with city rents')
+    verify_parser = commands.add_parser('verify', help='check parity with the Dart RentCalculator')
+    verify_parser.add_argument('--rows', type=int, default=100000, help='synthetic households to compare')
+    verify_parser.add_argument('--data', type=Path, default=OUTPUT_PATH, help='zillow_data.json with city rents')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run(args.households, args.output, args.data)
+        return 0
+
+    errors = verify(args.rows, args.data)
+    for error in errors:
+        print(f"  {error}")
+    print("Parity OK" if not errors else f"Parity FAILED ({len(errors)} errors)")
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
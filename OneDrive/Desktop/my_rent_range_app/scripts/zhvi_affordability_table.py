@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Precomputed affordability lookup table for the app
+Tabulates RentCalculator's net income and conservative/balanced/stretch
+rents over monthly gross income buckets x state x car x roommates x
+bedroom configuration, in cents, and stores each matched city's Zillow
+rent alongside. A query is one offset computation into a flat table, so
+the app (or a static CDN) can answer without any tax math.
+
+Before the clamp at zero, net income and the three rents are linear in
+gross income, so the table stores those unclamped values (negative when
+the car cost exceeds the after-tax income) at every multiple of the income
+step. A reader interpolates between the two buckets around the income,
+which sit next to each other in the table, and clamps at zero. That is
+exact apart from rounding to the cent, whatever the step; the step only
+sets the size (about 3.2 MB with the defaults, 401 buckets up to
+$20,000/month). Incomes above the last bucket are not covered, and readers
+fall back to the exact formulas.
+
+States with the same tax rate share one slice of the table, so the state
+dimension is a small state -> rate class map. write also produces an
+error report comparing the table with the exact formulas
+(zhvi_affordability.py) over every whole-dollar income.
+
+Layout (all integers little-endian):
+    header  magic 'ZRAT', version u16, value_bytes u16, income_step u32,
+            bucket_count u32, class_count u16, state_count u16,
+            default_class u16, reserved u16, city_count u32, then offsets
+            of the states, the table and the cities (u32 each)
+    states  per state, sorted: 2 ASCII bytes, u8 rate class, u8 reserved
+    table   signed value_bytes integers (cents, before the clamp at zero)
+            indexed [class][car][roommates][bedroom][bucket][field], fields net,
+            conservative, balanced, stretch; bedrooms in BedroomConfiguration
+            order (studio, 1, 2, 3+)
+    cities  u32 name offsets[city_count + 1], UTF-8 names sorted by bytes,
+            then u32 rents[city_count]
+
+Usage:
+    python zhvi_affordability_table.py write  [zillow_data.json] [TABLE.bin] [--step 50] [--max-income 20000]
+    python zhvi_affordability_table.py lookup TABLE.bin GROSS_MONTHLY STATE CAR ROOMMATES BEDROOMS
+    python zhvi_affordability_table.py city   TABLE.bin "Denver"
+"""
+
+import argparse
+import json
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from zhvi_affordability import (
+    BEDROOM_MULTIPLIERS, CAR_OWNERSHIP_COST, DEFAULT_STATE_TAX_RATE, FICA_RATE, RANGE_SHARES,
+    STATE_TAX_RATES, bedroom_name, net_income, rent_ranges,
+)
+
+MAGIC = b'ZRAT'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHHIIHHHHIIII')
+STATE_ENTRY = struct.Struct('<2sBB')
+
+DEFAULT_INCOME_STEP = 50
+DEFAULT_MAX_INCOME = 20000
+FIELDS = ('net_monthly', 'conservative', 'balanced', 'stretch')
+BEDROOMS = tuple(BEDROOM_MULTIPLIERS)
+
+def quantize(values):
+    """Whole cents, halves rounded up"""
+    return np.floor(values * 100 + 0.5)
+
+def rate_classes():
+    """([distinct tax rates], {state: class index}, default class index)"""
+    rates = sorted(set(STATE_TAX_RATES.values()) | {DEFAULT_STATE_TAX_RATE})
+    class_of = {rate: i for i, rate in enumerate(rates)}
+    states = {state: class_of[rate] for state, rate in sorted(STATE_TAX_RATES.items())}
+    return rates, states, class_of[DEFAULT_STATE_TAX_RATE]
+
+def exact_values(gross_monthly, rate, car, roommates, bedroom):
+    """Unrounded (net, conservative, balanced, stretch) arrays from the exact formulas"""
+    net = net_income(gross_monthly, rate, car)
+    return (net,) + rent_ranges(net, roommates, BEDROOM_MULTIPLIERS[bedroom])
+
+def linear_values(gross_monthly, rate, car, roommates, bedroom):
+    """exact_values() without the clamp at zero, so linear in gross income"""
+    net = gross_monthly * (1 - FICA_RATE - rate) - (CAR_OWNERSHIP_COST if car else 0)
+    shares = RANGE_SHARES['roommates' if roommates else 'alone']
+    return (net,) + tuple(net * share * BEDROOM_MULTIPLIERS[bedroom] for share in shares)
+
+def interpolate(lower, upper, fraction):
+    """Values between two buckets, clamped at zero and converted to dollars"""
+    value = lower + (upper - lower) * fraction
+    return np.maximum(value, 0) / 100
+
+def build_table(income_step, bucket_count):
+    """Cents before the clamp, shaped [class][car][roommates][bedroom][bucket][field]"""
+    rates, _, _ = rate_classes()
+    gross = np.arange(bucket_count, dtype=np.float64) * income_step
+    table = np.empty((len(rates), 2, 2, len(BEDROOMS), bucket_count, len(FIELDS)))
+    for c, rate in enumerate(rates):
+        for car in (0, 1):
+            for roommates in (0, 1):
+                for b, bedroom in enumerate(BEDROOMS):
+                    values = linear_values(gross, rate, bool(car), bool(roommates), bedroom)
+                    table[c, car, roommates, b] = quantize(np.stack(values, axis=1))
+    return table
+
+def encode_cities(zillow_data):
+    """City section bytes: names sorted by UTF-8 with their whole-dollar rents"""
+    names = sorted((name.encode('utf-8'), int(round(record['rent_estimate'])))
+                   for name, record in zillow_data.items())
+    offsets = [0]
+    for name, _ in names:
+        offsets.append(offsets[-1] + len(name))
+    blob = b''.join(name for name, _ in names)
+    padding = b'\0' * ((-len(blob)) % 4)
+    return (np.asarray(offsets, dtype='<u4').tobytes() + blob + padding
+            + np.asarray([rent for _, rent in names], dtype='<u4').tobytes()), len(names)
+
+def encode_table(zillow_data, income_step=DEFAULT_INCOME_STEP, max_income=DEFAULT_MAX_INCOME):
+    """(artifact bytes, table in cents) for the given grid"""
+    if not 0 < income_step <= max_income:
+        raise ValueError(f"Income step must be between 1 and the max income ({max_income}), got {income_step}")
+    bucket_count = max_income // income_step + 1
+    table = build_table(income_step, bucket_count)
+    value_bytes = 4
+
+    rates, states, default_class = rate_classes()
+    states_section = b''.join(STATE_ENTRY.pack(state.encode('ascii'), c, 0) for state, c in states.items())
+    table_section = table.astype(f'<i{value_bytes}').tobytes()
+    cities_section, city_count = encode_cities(zillow_data)
+
+    states_offset = HEADER.size
+    table_offset = states_offset + len(states_section)
+    cities_offset = table_offset + len(table_section)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, value_bytes, income_step, bucket_count, len(rates), len(states),
+        default_class, 0, city_count, states_offset, table_offset, cities_offset,
+    )
+    return header + states_section + table_section + cities_section, table
+
+class AffordabilityTable:
+    """Reader answering lookups with one offset computation"""
+
+    def __init__(self, data):
+        (magic, version, value_bytes, income_step, bucket_count, class_count, state_count, default_class,
+         _, city_count, states_offset, table_offset, cities_offset) = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not an affordability table")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported table version {version}")
+
+        self.data = data
+        self.value_bytes = value_bytes
+        self.income_step = income_step
+        self.bucket_count = bucket_count
+        self.class_count = class_count
+        self.default_class = default_class
+        self.classes = {}
+        for i in range(state_count):
+            state, c, _ = STATE_ENTRY.unpack_from(data, states_offset + i * STATE_ENTRY.size)
+            self.classes[state.decode('ascii')] = c
+        self.table_offset = table_offset
+        self._record_size = len(FIELDS) * value_bytes
+        # Two adjacent buckets, lower then upper
+        self._values = struct.Struct(f"<{2 * len(FIELDS)}i")
+
+        self.city_count = city_count
+        self._name_offsets = np.frombuffer(data, dtype='<u4', count=city_count + 1, offset=cities_offset)
+        self._names_offset = cities_offset + 4 * (city_count + 1)
+        blob_size = int(self._name_offsets[-1]) if city_count else 0
+        rents_offset = self._names_offset + blob_size + (-blob_size) % 4
+        self._rents = np.frombuffer(data, dtype='<u4', count=city_count, offset=rents_offset)
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def offset(self, gross_monthly, state, car, roommates, bedroom_index):
+        """(byte offset of the bucket at or below the income, fraction of the way
+        to the next bucket), or None when the income is outside the table"""
+        position = gross_monthly / self.income_step
+        bucket = int(position)
+        if gross_monthly < 0 or position > self.bucket_count - 1:
+            return None
+        # The last bucket has no successor; read it as the upper of a pair
+        bucket = min(bucket, self.bucket_count - 2)
+        c = self.classes.get(state.upper(), self.default_class)
+        cell = ((((c * 2 + car) * 2 + roommates) * len(BEDROOMS) + bedroom_index) * self.bucket_count + bucket)
+        return self.table_offset + cell * self._record_size, position - bucket
+
+    def lookup(self, gross_monthly, state, car, roommates, bedroom='1'):
+        """{'net_monthly', 'conservative', 'balanced', 'stretch'} in dollars, or None
+
+        Raises ValueError for a bedrooms value RentCalculator does not know.
+        """
+        name = bedroom_name(bedroom)
+        if name is None:
+            raise ValueError(f"Unknown bedrooms value: {bedroom!r}")
+        found = self.offset(gross_monthly, state, int(bool(car)), int(bool(roommates)), BEDROOMS.index(name))
+        if found is None:
+            return None
+        offset, fraction = found
+        values = self._values.unpack_from(self.data, offset)
+        lower = np.asarray(values[:len(FIELDS)], dtype=np.float64)
+        upper = np.asarray(values[len(FIELDS):], dtype=np.float64)
+        return {field: round(float(value), 2) for field, value in zip(FIELDS, interpolate(lower, upper, fraction))}
+
+    def _name(self, i):
+        start = self._names_offset + int(self._name_offsets[i])
+        end = self._names_offset + int(self._name_offsets[i + 1])
+        return bytes(self.data[start:end])
+
+    def city_rent(self, city_name):
+        """Binary-search the city names; returns the whole-dollar rent or None"""
+        target = city_name.encode('utf-8')
+        lo, hi = 0, self.city_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.city_count and self._name(lo) == target:
+            return int(self._rents[lo])
+        return None
+
+class ErrorStats:
+    """Absolute error summary built up batch by batch, with a histogram in cents"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.cents = np.zeros(1, dtype=np.int64)
+
+    def add(self, errors):
+        errors = np.abs(errors)
+        self.count += len(errors)
+        self.total += float(errors.sum())
+        self.max = max(self.max, float(errors.max()))
+        counts = np.bincount(np.rint(errors * 100).astype(np.intp))
+        if len(counts) > len(self.cents):
+            self.cents = np.pad(self.cents, (0, len(counts) - len(self.cents)))
+        self.cents[:len(counts)] += counts
+
+    def to_dict(self):
+        cumulative = np.cumsum(self.cents)
+        return {
+            'max_abs': round(self.max, 4),
+            'mean_abs': round(self.total / self.count, 4),
+            'p99_abs': int(np.searchsorted(cumulative, 0.99 * self.count)) / 100,
+            'within_1_dollar': round(float(cumulative[min(100, len(cumulative) - 1)]) / self.count, 6),
+        }
+
+def error_report(table, income_step, zillow_data, reader):
+    """Compare the table with the exact formulas at every whole-dollar income
+
+    Bucket errors are measured at the bucket incomes themselves (rounding
+    only); income errors over every whole-dollar monthly income the table
+    covers, interpolated like AffordabilityTable.lookup().
+    """
+    rates, _, _ = rate_classes()
+    bucket_count = table.shape[4]
+    bucket_gross = np.arange(bucket_count, dtype=np.float64) * income_step
+    gross = np.arange(0, (bucket_count - 1) * income_step + 1, dtype=np.float64)
+    position = gross / income_step
+    lower = np.minimum(np.floor(position).astype(np.intp), bucket_count - 2)
+    fraction = position - lower
+
+    bucket_errors = {field: ErrorStats() for field in FIELDS}
+    income_errors = {field: ErrorStats() for field in FIELDS}
+    for c, rate in enumerate(rates):
+        for car in (0, 1):
+            for roommates in (0, 1):
+                for b, bedroom in enumerate(BEDROOMS):
+                    cell = table[c, car, roommates, b]
+                    at_buckets = exact_values(bucket_gross, rate, bool(car), bool(roommates), bedroom)
+                    everywhere = exact_values(gross, rate, bool(car), bool(roommates), bedroom)
+                    for f, field in enumerate(FIELDS):
+                        bucket_errors[field].add(np.maximum(cell[:, f], 0) / 100 - at_buckets[f])
+                        interpolated = interpolate(cell[lower, f], cell[lower + 1, f], fraction)
+                        income_errors[field].add(interpolated - everywhere[f])
+
+    city_errors = [abs(reader.city_rent(name) - record['rent_estimate']) for name, record in zillow_data.items()]
+    return {
+        'income_step': income_step,
+        'max_income': int(bucket_gross[-1]),
+        'rate_classes': len(rates),
+        'cells': int(np.prod(table.shape[:5])),
+        'incomes_checked': len(gross),
+        'bucket_errors': {field: stats.to_dict() for field, stats in bucket_errors.items()},
+        'income_errors': {field: stats.to_dict() for field, stats in income_errors.items()},
+        'cities': len(city_errors),
+        'city_rent_max_abs_error': max(city_errors, default=0),
+    }
+
+def write_table(zillow_data, output_path, income_step=DEFAULT_INCOME_STEP, max_income=DEFAULT_MAX_INCOME):
+    """Write the table and its error report; returns the report path"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    data, table = encode_table(zillow_data, income_step, max_income)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+
+    report = error_report(table, income_step, zillow_data, AffordabilityTable(data))
+    report_path = output_path.with_name(output_path.stem + '.errors.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Affordability table saved to: {output_path} ({len(data):,} bytes, {report['cells']:,} cells)")
+    worst = max(stats['max_abs'] for stats in report['income_errors'].values())
+    print(f"Error report saved to: {report_path} (max ${worst:,.3f} off the exact formulas)")
+    return report_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    write_parser = commands.add_parser('write', help='build the table from zillow_data.json')
+    write_parser.add_argument('data', type=Path, nargs='?', help='zillow_data.json')
+    write_parser.add_argument('output', type=Path, nargs='?', help='table to write')
+    write_parser.add_argument('--step', type=int, default=DEFAULT_INCOME_STEP, help='monthly income bucket width')
+    write_parser.add_argument('--max-income', type=int, default=DEFAULT_MAX_INCOME,
+                              help='highest monthly gross income covered')
+    lookup_parser = commands.add_parser('lookup', help='look up one cell')
+    lookup_parser.add_argument('table', type=Path)
+    lookup_parser.add_argument('gross_monthly', type=float)
+    lookup_parser.add_argument('state')
+    lookup_parser.add_argument('car', type=int, choices=[0, 1])
+    lookup_parser.add_argument('roommates', type=int, choices=[0, 1])
+    lookup_parser.add_argument('bedrooms', help='studio, 1, 2 or 3+ (as in the households CSV)')
+    city_parser = commands.add_parser('city', help='look up one city rent')
+    city_parser.add_argument('table', type=Path)
+    city_parser.add_argument('city')
+    args = parser.parse_args(argv)
+
+    if args.command == 'write':
+        if not 0 < args.step <= args.max_income:
+            parser.error('--step must be between 1 and --max-income')
+        from parse_zillow_data import OUTPUT_PATH
+        data_path = args.data or OUTPUT_PATH
+        output_path = args.output or data_path.with_suffix('.affordability.bin')
+        with open(data_path, 'r') as f:
+            write_table(json.load(f), output_path, args.step, args.max_income)
+        return 0
+
+    table = AffordabilityTable.open(args.table)
+    if args.command == 'lookup':
+        try:
+            result = table.lookup(args.gross_monthly, args.state, args.car, args.roommates, args.bedrooms)
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        result = table.city_rent(args.city)
+    print(json.dumps(result))
+    return 0 if result is not None else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Rolling-window analytics over the full ZHVI price history
+Cumulative sums (and sums of squares) are built once per region across all
+months, so every window query below is O(1) per region: N-month averages,
+point-to-point change, year-over-year change, CAGR, volatility of monthly
+returns and trend classification with configurable thresholds.
+
+A window statistic is only computed over a full window: when any month in
+it has no value (including months before the region's history starts or
+before the first month in the file), it is NaN, written as null.
+"""
+
+import numpy as np
+
+from parse_zillow_data import RENT_TO_HOME_VALUE_RATIO, WINDOW_SIZE, rent_ratio
+from zhvi_matrix import load_zhvi_matrix
+
+DEFAULT_WINDOWS = (3, 6, 12)
+DEFAULT_CAGR_YEARS = (5, 10)
+# Percent change between consecutive windows that counts as up or down
+DEFAULT_TREND_THRESHOLD = 2.0
+
+def build_prefix_sums(values):
+    """Cumulative sum, sum of squares and valid count along the month axis
+
+    Each array has one extra leading column of zeros, so the sum over months
+    [start, end) is prefix[:, end] - prefix[:, start]. Always float64: prefix
+    sums of home values lose precision quickly in float32.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    n_regions = values.shape[0]
+    zeros = np.zeros((n_regions, 1))
+    return {
+        'sum': np.hstack([zeros, np.cumsum(filled, axis=1)]),
+        'sumsq': np.hstack([zeros, np.cumsum(filled * filled, axis=1)]),
+        'count': np.hstack([zeros, np.cumsum(valid, axis=1, dtype=np.float64)]),
+    }
+
+def build_return_prefix_sums(values):
+    """Prefix sums of month-over-month returns, NaN where either month is missing"""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = values[:, 1:] / values[:, :-1] - 1.0
+    # Returns[:, t] ends at month t + 1; pad so month indices line up
+    padded = np.hstack([np.full((values.shape[0], 1), np.nan), returns])
+    return build_prefix_sums(padded)
+
+def _window_bounds(prefix, end, length):
+    """Row indices and prefix columns [start, stop) of a window per region
+
+    end is one month index or an array with one per region. The start is
+    clipped at the first month, so a window reaching before it holds fewer
+    than `length` months; window_mean() and window_std() return NaN for it.
+    """
+    rows = np.arange(prefix['sum'].shape[0])
+    stop = np.clip(np.asarray(end) + 1, 0, None)
+    start = np.clip(stop - length, 0, None)
+    return rows, np.broadcast_to(start, rows.shape), np.broadcast_to(stop, rows.shape)
+
+def window_mean(prefix, end, length):
+    """Mean over the `length` months ending at month index `end` (inclusive),
+    NaN unless all of them have a value"""
+    rows, start, stop = _window_bounds(prefix, end, length)
+    total = prefix['sum'][rows, stop] - prefix['sum'][rows, start]
+    count = prefix['count'][rows, stop] - prefix['count'][rows, start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count >= length, total / count, np.nan)
+
+def window_std(prefix, end, length):
+    """Population standard deviation over a full window (as window_mean()),
+    from the sums of squares"""
+    rows, start, stop = _window_bounds(prefix, end, length)
+    total = prefix['sum'][rows, stop] - prefix['sum'][rows, start]
+    total_sq = prefix['sumsq'][rows, stop] - prefix['sumsq'][rows, start]
+    count = prefix['count'][rows, stop] - prefix['count'][rows, start]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / count
+        variance = np.maximum(total_sq / count - mean * mean, 0.0)
+        return np.where((count >= length) & (count > 1), np.sqrt(variance), np.nan)
+
+def percent_change(new, old):
+    """Percent change, NaN where either side is missing"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (new / old - 1.0) * 100
+
+def classify_trend(change_pct, threshold=DEFAULT_TREND_THRESHOLD):
+    """'up' / 'down' / 'stable' per region; missing changes count as stable"""
+    trend = np.full(change_pct.shape, 'stable', dtype=object)
+    trend[change_pct > threshold] = 'up'
+    trend[change_pct < -threshold] = 'down'
+    return trend
+
+def latest_valid_month(values, lookback=WINDOW_SIZE):
+    """Per region, the last month index with a value among the latest
+    `lookback` months, or -1 when there is none
+
+    This is the month compute_metro_record() treats as a region's latest.
+    """
+    first = max(values.shape[1] - lookback, 0)
+    valid = ~np.isnan(values[:, first:])
+    last = valid.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    return np.where(valid.any(axis=1), first + last, -1)
+
+def compute_window_analytics(values, windows=DEFAULT_WINDOWS, cagr_years=DEFAULT_CAGR_YEARS,
+                             trend_threshold=DEFAULT_TREND_THRESHOLD, end=None,
+                             ratios=RENT_TO_HOME_VALUE_RATIO):
+    """Compute every analytics field for all regions in one pass
+
+    Returns {field_name: array over regions}. `end` is the month index the
+    windows end at, one for all regions or an array with one per region;
+    by default each region's latest_valid_month(), so a region Zillow has
+    not reported for the newest month is anchored on its last reported one.
+    `ratios` is the rent-to-home-value ratio, a scalar or one per region.
+    """
+    if end is None:
+        end = latest_valid_month(values)
+
+    prices = build_prefix_sums(values)
+    returns = build_return_prefix_sums(values)
+    latest = window_mean(prices, end, 1)
+
+    fields = {}
+    for n in windows:
+        recent = window_mean(prices, end, n)
+        fields[f'avg_home_value_{n}m'] = recent
+        fields[f'avg_rent_estimate_{n}m'] = np.round(recent * ratios, 0)
+
+        # NaN (so 'stable') unless both windows are full
+        fields[f'change_{n}m_pct'] = percent_change(latest, window_mean(prices, end - n, 1))
+        window_change = percent_change(recent, window_mean(prices, end - n, n))
+        fields[f'trend_{n}m'] = classify_trend(window_change, trend_threshold)
+
+        # Volatility: standard deviation of monthly returns, in percent
+        fields[f'volatility_{n}m_pct'] = window_std(returns, end, n) * 100
+
+    fields['yoy_change_pct'] = percent_change(latest, window_mean(prices, end - 12, 1))
+
+    for years in cagr_years:
+        start_value = window_mean(prices, end - 12 * years, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fields[f'cagr_{years}y_pct'] = (np.power(latest / start_value, 1.0 / years) - 1.0) * 100
+
+    return fields
+
+def _json_value(value):
+    """Plain JSON value: NaN becomes null, floats are rounded for output"""
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    if np.isnan(value) or np.isinf(value):
+        return None
+    return round(value, 2)
+
+def analytics_by_region(matrix, fields):
+    """Turn field arrays into {region_name: record}; later duplicate rows win"""
+    columns = {name: array.tolist() for name, array in fields.items()}
+    records = {}
+    for i, region_name in enumerate(matrix['regions']):
+        record = {'region_name': region_name, 'state': matrix['states'][i]}
+        for name, column in columns.items():
+            record[name] = _json_value(column[i])
+        records[region_name] = record
+    return records
+
+def run_analytics(csv_path, matcher, windows=DEFAULT_WINDOWS,
+                  trend_threshold=DEFAULT_TREND_THRESHOLD, cagr_years=DEFAULT_CAGR_YEARS, calibration=None):
+    """Load the history, compute analytics and match them to our cities
+
+    With a calibration, rent averages use each metro's calibrated ratio,
+    like zillow_data.json does.
+    """
+    matrix = load_zhvi_matrix(csv_path, region_filter=matcher)
+    dates = matrix['dates']
+    print(f"Loaded {len(matrix['regions'])} regions x {len(dates)} months")
+
+    values = matrix['values']
+    end = latest_valid_month(values)
+    ratios = np.array([rent_ratio(region_name, calibration) for region_name in matrix['regions']])
+    fields = compute_window_analytics(values, windows, cagr_years, trend_threshold, end, ratios)
+    records = analytics_by_region(matrix, fields)
+    # Later duplicate rows win here too, as in analytics_by_region()
+    for region_name, month in zip(matrix['regions'], end.tolist()):
+        records[region_name]['as_of'] = dates[month] if month >= 0 else None
+    matched_data, _ = matcher.match(records)
+    return matched_data
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Batch ingestion of several Zillow ZHVI datasets in one run
+Each CSV is parsed in its own worker process and the matched records are
+merged into one output keyed by city, then by dataset name
+
+Manifest format (paths are relative to the manifest file):
+    {
+      "datasets": [
+        {"name": "metro_mid", "csv": "Metro_zhvi_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"},
+        {"name": "metro_bottom", "csv": "Metro_zhvi_uc_sfrcondo_tier_0.0_0.33_sm_sa_month.csv"},
+        {"name": "metro_2br", "csv": "Metro_zhvi_bdrmcnt_2_uc_sfrcondo_tier_0.33_0.67_sm_sa_month.csv"}
+      ]
+    }
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from parse_zillow_data import apply_rent_ratios, parse_zillow_csv
+
+def load_manifest(manifest_path):
+    """Load the list of datasets to parse, resolving CSV paths"""
+    manifest_path = Path(manifest_path)
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+
+    datasets = []
+    seen = set()
+    for entry in manifest.get('datasets', []):
+        name = entry.get('name')
+        csv_path = entry.get('csv')
+        if not name or not csv_path:
+            raise ValueError(f"Manifest entry needs 'name' and 'csv': {entry}")
+        if name in seen:
+            raise ValueError(f"Duplicate dataset name in manifest: {name}")
+        seen.add(name)
+        datasets.append({'name': name, 'csv': str(manifest_path.parent / csv_path)})
+
+    return datasets
+
+def parse_dataset(dataset, region_filter=None, engine='python'):
+    """Worker entry point: parse one dataset and return (name, metro_data)"""
+    if engine == 'numpy':
+        from zhvi_matrix import parse_zillow_matrix
+        metro_data = parse_zillow_matrix(dataset['csv'], region_filter=region_filter)
+    else:
+        metro_data = parse_zillow_csv(dataset['csv'], region_filter=region_filter)
+    return dataset['name'], metro_data
+
+def parse_datasets(datasets, region_filter=None, engine='python', workers=None):
+    """Parse datasets concurrently, returning results in manifest order"""
+    workers = min(workers or os.cpu_count() or 1, len(datasets)) or 1
+    if workers == 1:
+        return [parse_dataset(dataset, region_filter, engine) for dataset in datasets]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_dataset, dataset, region_filter, engine) for dataset in datasets]
+        return [future.result() for future in futures]
+
+def merge_datasets(results, matcher, calibration=None):
+    """Merge per-dataset metro data into {city_name: {dataset_name: record}}"""
+    merged = {}
+    for name, metro_data in results:
+        if calibration is not None:
+            apply_rent_ratios(metro_data, calibration)
+        matched_data, _ = matcher.match(metro_data)
+        print(f"  {name}: {len(metro_data)} metros, {len(matched_data)} matched")
+        for city_name, record in matched_data.items():
+            merged.setdefault(city_name, {})[name] = record
+    return merged
+
+def run_batch(manifest_path, matcher, engine='python', workers=None, calibration=None):
+    """Parse every dataset in the manifest and merge the matched records
+
+    The RegionMatcher doubles as the region filter in each worker. Rent
+    estimates use the calibration's per-metro ratios when one is given.
+    """
+    datasets = load_manifest(manifest_path)
+    print(f"Parsing {len(datasets)} datasets...")
+    results = parse_datasets(datasets, matcher, engine, workers)
+    return merge_datasets(results, matcher, calibration)
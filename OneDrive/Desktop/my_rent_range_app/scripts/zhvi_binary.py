@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Compact binary artifact for zillow_data.json
+Stores the matched city records as a versioned file with a deduplicated
+string table, fixed-width numeric columns and a sorted city index, so a
+reader can binary-search one city without decoding the rest.
+
+Layout (all integers little-endian):
+    header   magic 'ZRRB', version u16, reserved u16, record_count u32,
+             string_count u32, then offsets of the string table, the columns
+             and the city index (u32 each)
+    strings  u32 offsets[string_count + 1] followed by one UTF-8 blob
+    columns  home_value f64[n], rent_estimate i32[n], then u32 string ids
+             for city_name, region_name, state, trend and last_updated
+    index    u32 record ids ordered by UTF-8 city name
+
+Usage:
+    python zhvi_binary.py write  [zillow_data.json] [zillow_data.bin]
+    python zhvi_binary.py verify [zillow_data.json] [zillow_data.bin]
+    python zhvi_binary.py lookup zillow_data.bin "Denver"
+"""
+
+import json
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+MAGIC = b'ZRRB'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIIIII')
+
+# Record fields stored as string table references, in column order
+STRING_FIELDS = ('city_name', 'region_name', 'state', 'trend', 'last_updated')
+
+def _u32_array(values):
+    """array('I') in little-endian byte order"""
+    arr = array('I', values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+def _read_array(typecode, data, offset, count):
+    """Read count little-endian items of typecode from data at offset"""
+    arr = array(typecode)
+    arr.frombytes(data[offset:offset + count * arr.itemsize])
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+def encode_binary(matched_data):
+    """Encode {city_name: record} as the binary artifact"""
+    strings = []
+    string_ids = {}
+
+    def intern(value):
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    city_names = list(matched_data)
+    home_values = array('d')
+    rent_estimates = array('i')
+    string_columns = {field: [] for field in STRING_FIELDS}
+
+    for city_name in city_names:
+        record = matched_data[city_name]
+        home_values.append(record['home_value'])
+        rent_estimates.append(int(record['rent_estimate']))
+        for field in STRING_FIELDS:
+            value = city_name if field == 'city_name' else record[field]
+            string_columns[field].append(intern(value))
+
+    encoded = [s.encode('utf-8') for s in strings]
+    blob = b''.join(encoded)
+    string_offsets = [0]
+    for item in encoded:
+        string_offsets.append(string_offsets[-1] + len(item))
+
+    index = sorted(range(len(city_names)), key=lambda i: city_names[i].encode('utf-8'))
+
+    if sys.byteorder != 'little':
+        home_values.byteswap()
+        rent_estimates.byteswap()
+
+    strings_section = _u32_array(string_offsets).tobytes() + blob
+    columns_section = home_values.tobytes() + rent_estimates.tobytes() + b''.join(
+        _u32_array(string_columns[field]).tobytes() for field in STRING_FIELDS
+    )
+    index_section = _u32_array(index).tobytes()
+
+    strings_offset = HEADER.size
+    columns_offset = strings_offset + len(strings_section)
+    # Keep the f64 column 8-byte aligned for readers that map it directly
+    padding = (-columns_offset) % 8
+    columns_offset += padding
+    index_offset = columns_offset + len(columns_section)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, len(city_names), len(strings),
+        strings_offset, columns_offset, index_offset,
+    )
+    return header + strings_section + b'\0' * padding + columns_section + index_section
+
+def write_binary(matched_data, output_path):
+    """Write the binary artifact for matched_data to output_path"""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(encode_binary(matched_data))
+
+class ZillowBinaryReader:
+    """Random-access reader for the binary artifact"""
+
+    def __init__(self, data):
+        magic, version, _, count, string_count, strings_offset, columns_offset, index_offset = \
+            HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a Zillow binary artifact")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported artifact version {version}")
+
+        self.data = data
+        self.count = count
+        self._string_offsets = _read_array('I', data, strings_offset, string_count + 1)
+        self._blob_offset = strings_offset + 4 * (string_count + 1)
+        self._string_cache = {}
+
+        offset = columns_offset
+        self._home_values = _read_array('d', data, offset, count)
+        offset += 8 * count
+        self._rent_estimates = _read_array('i', data, offset, count)
+        offset += 4 * count
+        self._string_columns = {}
+        for field in STRING_FIELDS:
+            self._string_columns[field] = _read_array('I', data, offset, count)
+            offset += 4 * count
+        self._index = _read_array('I', data, index_offset, count)
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def _string_bytes(self, string_id):
+        start = self._blob_offset + self._string_offsets[string_id]
+        end = self._blob_offset + self._string_offsets[string_id + 1]
+        return bytes(self.data[start:end])
+
+    def _string(self, string_id):
+        value = self._string_cache.get(string_id)
+        if value is None:
+            value = self._string_bytes(string_id).decode('utf-8')
+            self._string_cache[string_id] = value
+        return value
+
+    def record(self, i):
+        """Decode record i into the same dict zillow_data.json holds"""
+        columns = self._string_columns
+        return {
+            'region_name': self._string(columns['region_name'][i]),
+            'state': self._string(columns['state'][i]),
+            'home_value': self._home_values[i],
+            'rent_estimate': float(self._rent_estimates[i]),
+            'trend': self._string(columns['trend'][i]),
+            'last_updated': self._string(columns['last_updated'][i]),
+            'city_name': self._string(columns['city_name'][i]),
+        }
+
+    def lookup(self, city_name):
+        """Binary-search the city index; returns the record or None"""
+        target = city_name.encode('utf-8')
+        city_ids = self._string_columns['city_name']
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = self._index[mid]
+            if self._string_bytes(city_ids[i]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            i = self._index[lo]
+            if self._string_bytes(city_ids[i]) == target:
+                return self.record(i)
+        return None
+
+    def to_dict(self):
+        """Decode every record, in the original JSON order"""
+        result = {}
+        for i in range(self.count):
+            record = self.record(i)
+            result[record['city_name']] = record
+        return result
+
+def verify_round_trip(json_path, binary_path):
+    """Check the binary artifact decodes back to exactly the JSON content"""
+    with open(json_path, 'r') as f:
+        expected = json.load(f)
+    reader = ZillowBinaryReader.open(binary_path)
+
+    errors = []
+    decoded = reader.to_dict()
+    if list(decoded) != list(expected):
+        errors.append("City order differs")
+    for city_name, record in expected.items():
+        if decoded.get(city_name) != record:
+            errors.append(f"{city_name}: full decode mismatch")
+        if reader.lookup(city_name) != record:
+            errors.append(f"{city_name}: indexed lookup mismatch")
+    return errors
+
+if __name__ == '__main__':
+    from parse_zillow_data import OUTPUT_PATH
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'verify'
+    if command == 'lookup':
+        reader = ZillowBinaryReader.open(sys.argv[2])
+        print(json.dumps(reader.lookup(sys.argv[3]), indent=2))
+        sys.exit(0)
+
+    json_path = Path(sys.argv[2]) if len(sys.argv) > 2 else OUTPUT_PATH
+    binary_path = Path(sys.argv[3]) if len(sys.argv) > 3 else json_path.with_suffix('.bin')
+
+    if command == 'write':
+        with open(json_path, 'r') as f:
+            write_binary(json.load(f), binary_path)
+        print(f"Binary artifact saved to: {binary_path} ({binary_path.stat().st_size:,} bytes)")
+    elif command == 'verify':
+        errors = verify_round_trip(json_path, binary_path)
+        for error in errors:
+            print(f"  {error}")
+        print("Round trip OK" if not errors else f"Round trip FAILED ({len(errors)} errors)")
+        sys.exit(1 if errors else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Per-metro rent-to-value ratio calibration
+Aligns a ZORI-style rent index CSV (same column layout as ZHVI) with the
+ZHVI history on RegionName and month, then fits one ratio per metro with a
+single batched least-squares pass over all metros and months:
+
+    ratio = sum(value * rent) / sum(value * value)
+
+Each fit is shrunk toward the national ratio by `shrinkage` pseudo-months,
+so metros with little rent history stay close to it:
+
+    shrunk = (months * ratio + shrinkage * national) / (months + shrinkage)
+
+The national ratio is the fit of the "United States" row when both files
+have one, otherwise the pooled fit over every aligned metro. Zillow gives
+that row RegionType country and no StateName, so both files are loaded
+with keep_country=True.
+"""
+
+import json
+
+import numpy as np
+
+from parse_zillow_data import RENT_RATIOS_PATH
+from zhvi_matrix import load_zhvi_matrix
+
+NATIONAL_REGION = 'United States'
+# Pseudo-months of weight given to the national ratio
+DEFAULT_SHRINKAGE = 12.0
+# Most recent aligned months used for the fit; ratios drift over decades
+DEFAULT_MONTHS = 24
+
+def align_matrices(value_matrix, rent_matrix, months=DEFAULT_MONTHS):
+    """Home value and rent arrays over the regions and months both files share
+
+    Returns (regions, dates, values, rents) with values and rents shaped
+    regions x months, NaN where a file has no value.
+    """
+    rent_index = rent_matrix['region_index']
+    regions = [name for name in value_matrix['region_index'] if name in rent_index]
+
+    rent_dates = set(rent_matrix['dates'])
+    dates = [date for date in value_matrix['dates'] if date in rent_dates]
+    if months:
+        dates = dates[-months:]
+
+    def take(matrix):
+        date_index = {date: i for i, date in enumerate(matrix['dates'])}
+        rows = [matrix['region_index'][name] for name in regions]
+        cols = [date_index[date] for date in dates]
+        return matrix['values'][np.ix_(rows, cols)].astype(np.float64)
+
+    return regions, dates, take(value_matrix), take(rent_matrix)
+
+def fit_ratios(values, rents, shrinkage=DEFAULT_SHRINKAGE, national=None):
+    """Least-squares rent/value ratio per row, shrunk toward the national ratio
+
+    Returns (ratios, months, national). Rows without a single month where
+    both values exist get NaN and a month count of 0.
+    """
+    valid = ~np.isnan(values) & ~np.isnan(rents) & (values > 0)
+    v = np.where(valid, values, 0.0)
+    r = np.where(valid, rents, 0.0)
+
+    numerator = (v * r).sum(axis=1)
+    denominator = (v * v).sum(axis=1)
+    months = valid.sum(axis=1)
+
+    if national is None:
+        national = numerator.sum() / denominator.sum() if denominator.sum() > 0 else np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = numerator / denominator
+        ratios = (months * raw + shrinkage * national) / (months + shrinkage)
+    ratios[months == 0] = np.nan
+    return ratios, months, national
+
+def calibrate(value_matrix, rent_matrix, shrinkage=DEFAULT_SHRINKAGE, months=DEFAULT_MONTHS):
+    """Fit per-region ratios; returns the dict saved by save_rent_ratios()"""
+    regions, dates, values, rents = align_matrices(value_matrix, rent_matrix, months)
+
+    national = None
+    national_source = 'pooled'
+    if NATIONAL_REGION in regions:
+        i = regions.index(NATIONAL_REGION)
+        fitted, _, _ = fit_ratios(values[i:i + 1], rents[i:i + 1], shrinkage=0.0, national=0.0)
+        if not np.isnan(fitted[0]):
+            national = fitted[0]
+            national_source = 'country'
+
+    ratios, counts, national = fit_ratios(values, rents, shrinkage, national)
+    return {
+        'national_ratio': float(national),
+        'national_source': national_source,
+        'shrinkage': shrinkage,
+        'dates': [dates[0], dates[-1]] if dates else [],
+        'ratios': {
+            name: {'ratio': float(ratio), 'months': int(count)}
+            for name, ratio, count in zip(regions, ratios.tolist(), counts.tolist())
+            if count and name != NATIONAL_REGION
+        },
+    }
+
+def save_rent_ratios(calibration, ratios_path=RENT_RATIOS_PATH):
+    with open(ratios_path, 'w') as f:
+        json.dump(calibration, f, indent=2)
+
+def run_calibration(zhvi_csv, rent_csv, ratios_path=RENT_RATIOS_PATH,
+                    shrinkage=DEFAULT_SHRINKAGE, months=DEFAULT_MONTHS):
+    """Load both files, fit the ratios and persist them"""
+    value_matrix = load_zhvi_matrix(zhvi_csv, keep_country=True)
+    rent_matrix = load_zhvi_matrix(rent_csv, keep_country=True)
+    print(f"Loaded {len(value_matrix['regions'])} value and {len(rent_matrix['regions'])} rent regions")
+
+    calibration = calibrate(value_matrix, rent_matrix, shrinkage, months)
+    save_rent_ratios(calibration, ratios_path)
+    source = NATIONAL_REGION if calibration['national_source'] == 'country' else 'pooled metros'
+    print(f"National ratio: {calibration['national_ratio']:.5f} (from {source})")
+    print(f"Fitted {len(calibration['ratios'])} metro ratios over {' to '.join(calibration['dates'])}")
+    return calibration
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Delta patches between successive zillow_data.json generations
+Compares the previous artifact with the new one record by record and emits
+a compact patch of removed, added and changed cities, so clients can update
+over metered connections without downloading the whole file again.
+
+Numeric fields are compared with a relative tolerance. A city only counts
+as changed once some field moves beyond it, and then every field that
+differs is shipped so the record stays self-consistent. With a nonzero
+tolerance, the file to publish is the previous file with the patch applied
+(what clients will hold), not the fresh one. Otherwise small monthly moves
+would never be shipped and clients would drift further each month.
+
+A patch carries SHA-256 digests of the serialized base and target files.
+Applying it to the wrong base is refused, and the applied result is
+checked against the target, byte for byte.
+
+Usage:
+    python zhvi_delta.py diff   OLD.json NEW.json PATCH.json [TOLERANCE]
+    python zhvi_delta.py apply  BASE.json PATCH.json OUTPUT.json
+    python zhvi_delta.py verify BASE.json PATCH.json TARGET.json
+"""
+
+import hashlib
+import json
+import math
+import sys
+from pathlib import Path
+
+PATCH_VERSION = 1
+
+def serialize(data):
+    """Bytes exactly as write_json() stores them"""
+    return json.dumps(data, indent=2).encode('utf-8')
+
+def digest(data):
+    return hashlib.sha256(serialize(data)).hexdigest()
+
+def load_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def values_close(old, new, tolerance):
+    """Equal, or both numeric and within the relative tolerance"""
+    if old == new:
+        return True
+    if tolerance and is_number(old) and is_number(new):
+        return math.isclose(old, new, rel_tol=tolerance)
+    return False
+
+def diff_record(old, new, tolerance=0.0):
+    """Fields to update in old to get new, or None if within tolerance
+
+    Returns the string 'replace' when the record's fields themselves differ
+    (added, dropped or reordered), which a field update cannot express.
+    """
+    if list(old) != list(new):
+        return 'replace'
+    if all(values_close(old[field], new[field], tolerance) for field in new):
+        return None
+    return {field: value for field, value in new.items() if old[field] != value}
+
+def diff_records(old_data, new_data, tolerance=0.0):
+    """Build a patch that turns old_data into (a within-tolerance) new_data"""
+    removed = [city for city in old_data if city not in new_data]
+    added = {}
+    replaced = {}
+    changed = {}
+    for city, record in new_data.items():
+        if city not in old_data:
+            added[city] = record
+            continue
+        fields = diff_record(old_data[city], record, tolerance)
+        if fields == 'replace':
+            replaced[city] = record
+        elif fields:
+            changed[city] = fields
+
+    patch = {
+        'version': PATCH_VERSION,
+        'tolerance': tolerance,
+        'base_sha256': digest(old_data),
+        'removed': removed,
+        'added': added,
+        'replaced': replaced,
+        'changed': changed,
+    }
+    # Only ship the city order when the default (old order, then new cities) is wrong
+    order = [city for city in old_data if city in new_data] + list(added)
+    if order != list(new_data):
+        patch['order'] = list(new_data)
+    patch['target_sha256'] = digest(apply_patch(old_data, patch, check=False))
+    return patch
+
+def apply_patch(base_data, patch, check=True):
+    """Apply a patch to base_data and return the new data
+
+    With check, the base and the result must match the patch's digests.
+    """
+    if patch.get('version') != PATCH_VERSION:
+        raise ValueError(f"Unsupported patch version: {patch.get('version')}")
+    if check and digest(base_data) != patch['base_sha256']:
+        raise ValueError("Patch does not apply to this base file")
+
+    removed = set(patch['removed'])
+    data = {city: dict(record) for city, record in base_data.items() if city not in removed}
+    for city, fields in patch['changed'].items():
+        data[city].update(fields)
+    for city, record in patch['replaced'].items():
+        data[city] = record
+    for city, record in patch['added'].items():
+        data[city] = record
+    if 'order' in patch:
+        data = {city: data[city] for city in patch['order']}
+
+    if check and digest(data) != patch['target_sha256']:
+        raise ValueError("Patched data does not match the target digest")
+    return data
+
+def write_patch(patch, patch_path):
+    """Save a patch as compact JSON"""
+    patch_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(patch_path, 'w') as f:
+        json.dump(patch, f, separators=(',', ':'))
+
+def patch_summary(patch):
+    return (f"{len(patch['added'])} added, {len(patch['removed'])} removed, "
+            f"{len(patch['changed']) + len(patch['replaced'])} changed")
+
+def verify_patch(base_path, patch_path, target_path):
+    """Check that applying the patch to base reproduces target byte for byte"""
+    errors = []
+    try:
+        data = apply_patch(load_json(base_path), load_json(patch_path))
+    except (KeyError, ValueError) as e:
+        return [str(e)]
+    with open(target_path, 'rb') as f:
+        if f.read() != serialize(data):
+            errors.append(f"Patched output differs from {target_path}")
+    return errors
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'diff' and len(sys.argv) >= 5:
+        tolerance = float(sys.argv[5]) if len(sys.argv) > 5 else 0.0
+        old_data, new_data = load_json(sys.argv[2]), load_json(sys.argv[3])
+        patch = diff_records(old_data, new_data, tolerance)
+        patch_path = Path(sys.argv[4])
+        write_patch(patch, patch_path)
+        print(f"Patch ({patch_summary(patch)}) saved to: {patch_path} ({patch_path.stat().st_size:,} bytes)")
+    elif command == 'apply' and len(sys.argv) == 5:
+        data = apply_patch(load_json(sys.argv[2]), load_json(sys.argv[3]))
+        output_path = Path(sys.argv[4])
+        with open(output_path, 'wb') as f:
+            f.write(serialize(data))
+        print(f"Patched data saved to: {output_path}")
+    elif command == 'verify' and len(sys.argv) == 5:
+        errors = verify_patch(sys.argv[2], sys.argv[3], sys.argv[4])
+        for error in errors:
+            print(f"  {error}")
+        print("Patch OK" if not errors else f"Patch FAILED ({len(errors)} errors)")
+        sys.exit(1 if errors else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
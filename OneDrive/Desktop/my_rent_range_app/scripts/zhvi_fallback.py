@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Nearest-metro fallback estimates for cities without their own Zillow metro
+Metro centroids (region_name, latitude, longitude) are indexed once in a
+KD-tree over unit vectors on the sphere. Chord length orders points the
+same way great-circle distance does, so a plain 3-D nearest-neighbour
+search gives the exact k nearest metros. Every city in a local city list
+(city, state, latitude, longitude) that did not match a metro of its own
+gets an inverse-distance-weighted estimate from its k nearest metros
+within a distance cap, tagged with those source metros.
+"""
+
+import csv
+import heapq
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_K = 3
+DEFAULT_MAX_KM = 250.0
+# Distances below this count as this, so a metro at the city itself cannot divide by zero
+MIN_DISTANCE_KM = 1.0
+
+def unit_vector(latitude, longitude):
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+def km_to_chord(km):
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+# Points per KD-tree leaf; scanning a small bucket beats descending to single points
+LEAF_SIZE = 16
+
+class KDTree:
+    """Static 3-D KD-tree with bucketed leaves answering k-nearest queries"""
+
+    def __init__(self, points, items):
+        self.items = items
+        # Per node: split axis and value, children, or -1 and a leaf bucket
+        self.axes = []
+        self.splits = []
+        self.left = []
+        self.right = []
+        self.buckets = []
+        self.root = self._build([(x, y, z, i) for i, (x, y, z) in enumerate(points)], 0)
+
+    def _build(self, entries, depth):
+        node = len(self.axes)
+        self.axes.append(-1)
+        self.splits.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.buckets.append(None)
+        if len(entries) <= LEAF_SIZE:
+            self.buckets[node] = entries
+            return node
+
+        axis = depth % 3
+        entries.sort(key=lambda entry: entry[axis])
+        middle = len(entries) // 2
+        self.axes[node] = axis
+        self.splits[node] = entries[middle][axis]
+        self.left[node] = self._build(entries[:middle], depth + 1)
+        self.right[node] = self._build(entries[middle:], depth + 1)
+        return node
+
+    def nearest(self, point, k, max_chord=2.0):
+        """[(chord, item)] of the k nearest items within max_chord, closest first"""
+        px, py, pz = point
+        limit = max_chord * max_chord
+        heap = []  # max-heap of (-squared distance, item index)
+        # (node, lower bound on the squared distance of anything under it)
+        stack = [(self.root, 0.0)]
+        axes, splits, left, right, buckets = self.axes, self.splits, self.left, self.right, self.buckets
+        while stack:
+            node, bound = stack.pop()
+            if bound > limit:
+                continue
+            bucket = buckets[node]
+            if bucket is not None:
+                for x, y, z, i in bucket:
+                    d2 = (x - px) * (x - px) + (y - py) * (y - py) + (z - pz) * (z - pz)
+                    if d2 <= limit:
+                        if len(heap) < k:
+                            heapq.heappush(heap, (-d2, i))
+                            if len(heap) == k:
+                                limit = -heap[0][0]
+                        elif d2 < limit:
+                            heapq.heapreplace(heap, (-d2, i))
+                            limit = -heap[0][0]
+                continue
+
+            diff = point[axes[node]] - splits[node]
+            near, far = (left[node], right[node]) if diff < 0 else (right[node], left[node])
+            # The far side is popped last and skipped if limit has shrunk past it
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+        return [(math.sqrt(-d2), self.items[i]) for d2, i in sorted(heap, reverse=True)]
+
+def load_centroids(centroids_path):
+    """{region_name: (latitude, longitude)} from a region_name,latitude,longitude CSV"""
+    centroids = {}
+    with open(centroids_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                centroids[row['region_name'].strip()] = (float(row['latitude']), float(row['longitude']))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return centroids
+
+def load_cities(cities_path):
+    """[(city, state, latitude, longitude)] from a city,state,latitude,longitude CSV"""
+    cities = []
+    with open(cities_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                cities.append((row['city'].strip(), row['state'].strip().upper(),
+                               float(row['latitude']), float(row['longitude'])))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return cities
+
+def build_metro_index(metro_data, centroids):
+    """KD-tree over the parsed metros that have a centroid"""
+    points = []
+    records = []
+    for region_name, record in metro_data.items():
+        centroid = centroids.get(region_name)
+        if centroid is not None:
+            points.append(unit_vector(*centroid))
+            records.append(record)
+    print(f"Indexed {len(records)} metros with centroids")
+    return KDTree(points, records)
+
+def weighted_estimate(neighbours):
+    """Inverse-distance-weighted record from [(distance_km, metro record)]"""
+    weights = [1.0 / max(distance, MIN_DISTANCE_KM) for distance, _ in neighbours]
+    total = sum(weights)
+    home_value = sum(w * record['home_value'] for w, (_, record) in zip(weights, neighbours)) / total
+    rent = sum(w * record['rent_estimate'] for w, (_, record) in zip(weights, neighbours)) / total
+
+    votes = {}
+    for w, (_, record) in zip(weights, neighbours):
+        votes[record['trend']] = votes.get(record['trend'], 0.0) + w
+    trend = max(votes, key=votes.get)
+
+    return {
+        'home_value': home_value,
+        'rent_estimate': round(rent, 0),
+        'trend': trend,
+        'last_updated': max(record['last_updated'] for _, record in neighbours),
+        'estimate': 'nearest_metros',
+        'source_metros': [
+            {'region_name': record['region_name'], 'distance_km': round(distance, 1), 'weight': round(w / total, 4)}
+            for w, (distance, record) in zip(weights, neighbours)
+        ],
+    }
+
+def resolve_fallbacks(metro_data, matched_data, centroids, cities, k=DEFAULT_K, max_km=DEFAULT_MAX_KM):
+    """Estimates for the cities in `cities` that matched_data has no record for
+
+    Returns {"City, ST": record}; cities with no metro within max_km are
+    left out so the app keeps its own fallback for them. A city only counts
+    as matched when matched_data has it in the same state.
+    """
+    # Same-named cities in other states (Portland, ME vs Portland, OR) still need one
+    matched = {(city_name, record['state']) for city_name, record in matched_data.items()}
+    tree = build_metro_index(metro_data, centroids)
+    max_chord = km_to_chord(max_km)
+    fallbacks = {}
+    for city, state, latitude, longitude in cities:
+        if (city, state) in matched:
+            continue
+        found = tree.nearest(unit_vector(latitude, longitude), k, max_chord)
+        if not found:
+            continue
+        record = {'city_name': city, 'state': state}
+        record.update(weighted_estimate([(chord_to_km(chord), metro) for chord, metro in found]))
+        fallbacks[f"{city}, {state}"] = record
+    return fallbacks
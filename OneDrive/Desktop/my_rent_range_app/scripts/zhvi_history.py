@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Full-history monthly rent series per city, delta-encoded
+Computes the rent estimate for every month of every matched city in one
+vectorized pass over the ZHVI matrix, optionally averaged down to quarters,
+and stores each series as a start month, a first value and zigzag varint
+deltas in whole dollars. Most months move by less than $64, so a month
+typically costs one byte. Months Zillow has no value for inside a series are
+stored as gap runs and come back as None.
+
+Layout (integers little-endian):
+    header  magic 'ZRRH', version u16, step_months u16, city_count u32,
+            index_offset u32
+    series  per city, varints: start month (year * 12 + month - 1),
+            length, zigzag first value, zigzag deltas[length - 1],
+            gap_count, then (gap start, gap length) pairs
+    index   per city in UTF-8 name order: u16 name length, name,
+            u32 series offset
+
+Usage:
+    python zhvi_history.py lookup zillow_rent_history.bin "Denver"
+    python zhvi_history.py cities zillow_rent_history.bin
+"""
+
+import json
+import struct
+import sys
+
+import numpy as np
+
+from parse_zillow_data import rent_ratio
+from zhvi_matrix import compute_latest_metrics, load_zhvi_matrix
+
+MAGIC = b'ZRRH'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHHII')
+
+def month_number(date):
+    """'2025-09-30' -> year * 12 + month - 1"""
+    return int(date[:4]) * 12 + int(date[5:7]) - 1
+
+def month_label(number):
+    return f"{number // 12}-{number % 12 + 1:02d}"
+
+def monthly_axis(values, dates):
+    """Scatter the date columns onto a gapless month axis
+
+    Returns (first month number, values with one column per month, NaN
+    where the file has no column for a month).
+    """
+    months = [month_number(date) for date in dates]
+    if not months:
+        return 0, values[:, :0]
+    first = min(months)
+    axis = np.full((values.shape[0], max(months) - first + 1), np.nan)
+    axis[:, np.array(months) - first] = values
+    return first, axis
+
+def downsample_quarterly(first, values):
+    """Average each calendar quarter; returns (first quarter's first month, values)"""
+    lead = first % 3
+    width = lead + values.shape[1]
+    padded = np.full((values.shape[0], width + (-width) % 3), np.nan)
+    padded[:, lead:lead + values.shape[1]] = values
+    quarters = padded.reshape(values.shape[0], -1, 3)
+    valid = ~np.isnan(quarters)
+    counts = valid.sum(axis=2)
+    sums = np.where(valid, quarters, 0.0).sum(axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return first - lead, np.where(counts > 0, sums / counts, np.nan)
+
+def rent_series_matrix(values, ratios):
+    """Whole-dollar rent for every region and period, NaN where unknown"""
+    return np.round(values * ratios[:, None], 0)
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _get_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def encode_series(start, rents, step_months=1):
+    """Varint bytes for one series (a 1-D float array, NaN for gaps)"""
+    valid = np.flatnonzero(~np.isnan(rents))
+    out = bytearray()
+    if not len(valid):
+        _put_varint(out, start)
+        _put_varint(out, 0)
+        _put_varint(out, 0)
+        return bytes(out)
+
+    # Trim leading and trailing gaps; interior gaps carry the last value forward
+    lo, hi = valid[0], valid[-1] + 1
+    series = rents[lo:hi]
+    missing = np.isnan(series)
+    fill_index = np.maximum.accumulate(np.where(missing, 0, np.arange(len(series))))
+    filled = series[fill_index].astype(np.int64)
+    deltas = np.diff(filled)
+
+    _put_varint(out, start + int(lo) * step_months)
+    _put_varint(out, len(filled))
+    _put_varint(out, _zigzag(int(filled[0])))
+    for delta in deltas.tolist():
+        _put_varint(out, _zigzag(delta))
+
+    edges = np.diff(np.concatenate(([0], missing.astype(np.int8), [0])))
+    gap_starts = np.flatnonzero(edges == 1)
+    gap_ends = np.flatnonzero(edges == -1)
+    _put_varint(out, len(gap_starts))
+    for gap_start, gap_end in zip(gap_starts.tolist(), gap_ends.tolist()):
+        _put_varint(out, gap_start)
+        _put_varint(out, gap_end - gap_start)
+    return bytes(out)
+
+def decode_series(data, pos=0):
+    """(start month, [rent or None]) from the bytes at data[pos:]"""
+    start, pos = _get_varint(data, pos)
+    length, pos = _get_varint(data, pos)
+    rents = []
+    if length:
+        value, pos = _get_varint(data, pos)
+        value = _unzigzag(value)
+        rents.append(value)
+        for _ in range(length - 1):
+            delta, pos = _get_varint(data, pos)
+            value += _unzigzag(delta)
+            rents.append(value)
+    gap_count, pos = _get_varint(data, pos)
+    for _ in range(gap_count):
+        gap_start, pos = _get_varint(data, pos)
+        gap_length, pos = _get_varint(data, pos)
+        rents[gap_start:gap_start + gap_length] = [None] * gap_length
+    return start, rents
+
+def encode_history(series_by_city, step_months):
+    """Serialize {city: (start month, rent array)} to the file layout"""
+    blobs = bytearray()
+    offsets = {}
+    for city_name, (start, rents) in series_by_city.items():
+        offsets[city_name] = _HEADER.size + len(blobs)
+        blobs += encode_series(start, rents, step_months)
+
+    index = bytearray()
+    for city_name in sorted(offsets, key=lambda name: name.encode('utf-8')):
+        name = city_name.encode('utf-8')
+        index += struct.pack('<H', len(name)) + name + struct.pack('<I', offsets[city_name])
+
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, step_months, len(offsets), _HEADER.size + len(blobs))
+    return header + bytes(blobs) + bytes(index)
+
+class RentHistoryReader:
+    """Expands one city's series on demand from an encoded history file"""
+
+    def __init__(self, data):
+        magic, version, step_months, count, index_offset = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a rent history file (or an unsupported version)")
+        self.data = data
+        self.step_months = step_months
+        self.offsets = {}
+        pos = index_offset
+        for _ in range(count):
+            (length,) = struct.unpack_from('<H', data, pos)
+            name = data[pos + 2:pos + 2 + length].decode('utf-8')
+            (self.offsets[name],) = struct.unpack_from('<I', data, pos + 2 + length)
+            pos += 2 + length + 4
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def cities(self):
+        return list(self.offsets)
+
+    def series(self, city_name):
+        """{'city_name', 'step_months', 'dates', 'rents'} or None if unknown"""
+        offset = self.offsets.get(city_name)
+        if offset is None:
+            return None
+        start, rents = decode_series(self.data, offset)
+        dates = [month_label(start + i * self.step_months) for i in range(len(rents))]
+        return {'city_name': city_name, 'step_months': self.step_months, 'dates': dates, 'rents': rents}
+
+def build_history(csv_path, matcher, calibration=None, quarterly=False):
+    """Rent series for every matched city: ({city: (start, rents)}, step_months)"""
+    matrix = load_zhvi_matrix(csv_path, region_filter=matcher)
+    values = matrix['values']
+    print(f"Loaded {len(matrix['regions'])} regions x {len(matrix['dates'])} months")
+
+    # Same regions as the JSON output: a value in the latest six months, last row wins
+    has_data = compute_latest_metrics(values)['has_data']
+    metro_data = {}
+    for i, (region_name, state) in enumerate(zip(matrix['regions'], matrix['states'])):
+        if has_data[i]:
+            metro_data[region_name] = {'region_name': region_name, 'state': state, 'row': i}
+    matched_data, _ = matcher.match(metro_data)
+
+    rows = np.array([record['row'] for record in matched_data.values()], dtype=np.intp)
+    ratios = np.array([rent_ratio(record['region_name'], calibration) for record in matched_data.values()],
+                      dtype=np.float64)
+
+    first, monthly = monthly_axis(values[rows], matrix['dates'])
+    step_months = 1
+    if quarterly:
+        first, monthly = downsample_quarterly(first, monthly)
+        step_months = 3
+    rents = rent_series_matrix(monthly, ratios)
+
+    series_by_city = {city_name: (first, rents[j]) for j, city_name in enumerate(matched_data)}
+    return series_by_city, step_months
+
+def write_history(series_by_city, step_months, output_path):
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(encode_history(series_by_city, step_months))
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'lookup' and len(sys.argv) > 3:
+        series = RentHistoryReader.open(sys.argv[2]).series(sys.argv[3])
+        print(json.dumps(series))
+        sys.exit(0 if series else 1)
+    elif command == 'cities' and len(sys.argv) > 2:
+        for city_name in RentHistoryReader.open(sys.argv[2]).cities():
+            print(city_name)
+    else:
+        print(__doc__)
+        sys.exit(2)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Dense region-by-month matrix engine for Zillow ZHVI CSVs
+Loads the full price history into one NumPy array and computes the same
+metro records as parse_zillow_csv() with vectorized operations
+"""
+
+import csv
+import time
+
+import numpy as np
+
+from parse_zillow_data import RENT_TO_HOME_VALUE_RATIO, WINDOW_SIZE, get_date_columns, open_zhvi_csv
+
+def _to_float(val):
+    """Convert one raw CSV cell to float, NaN when blank or invalid"""
+    val = val.strip()
+    if not val:
+        return np.nan
+    try:
+        return float(val)
+    except ValueError:
+        return np.nan
+
+def _parse_row_values(fields, dtype):
+    """Convert a row's date fields to an array, with NaN for missing months"""
+    try:
+        # Fast path for clean rows; blank cells are the only gaps Zillow leaves
+        return np.array([float(val) if val else np.nan for val in fields], dtype=dtype)
+    except ValueError:
+        return np.array([_to_float(val) for val in fields], dtype=dtype)
+
+def load_zhvi_matrix(csv_path, region_filter=None, dtype=np.float64, report=None, keep_country=False):
+    """Load a ZHVI CSV into a region-by-month matrix
+
+    Returns a dict with 'regions' and 'states' (one entry per matrix row, in
+    file order), 'dates' (the month axis, oldest first), 'region_index'
+    (RegionName -> last row index) and 'values' (rows x months, NaN where
+    Zillow has no value). Use float32 to halve memory on zip-level files;
+    float64 is needed to reproduce parse_zillow_csv() bit for bit. Pass a
+    RunReport to time the header scan and row parsing.
+
+    Rows without a StateName are skipped, which drops Zillow's national
+    row ("United States", RegionType country). keep_country=True keeps it,
+    with an empty state.
+    """
+    regions = []
+    states = []
+    rows = []
+    stats = {'rows_read': 0, 'rows_missing_region': 0, 'rows_filtered': 0}
+
+    with open_zhvi_csv(csv_path) as f:
+        reader = csv.reader(f)
+        start = time.perf_counter()
+        header = next(reader, [])
+
+        positions = {col: i for i, col in enumerate(header)}
+        region_index = positions.get('RegionName')
+        state_index = positions.get('StateName')
+        type_index = positions.get('RegionType') if keep_country else None
+        dates = get_date_columns(header)
+        date_indices = [positions[col] for col in dates]
+        last_date_index = max(date_indices, default=-1)
+        if report is not None:
+            report.add_time('header_scan', time.perf_counter() - start)
+            start = time.perf_counter()
+
+        for row in reader:
+            width = len(row)
+            region_name = row[region_index].strip() if region_index is not None and region_index < width else ''
+            state = row[state_index].strip() if state_index is not None and state_index < width else ''
+            stats['rows_read'] += 1
+
+            if not region_name or not state:
+                is_country = type_index is not None and type_index < width and row[type_index].strip() == 'country'
+                if not region_name or not is_country:
+                    stats['rows_missing_region'] += 1
+                    continue
+            if region_filter is not None and region_name not in region_filter:
+                stats['rows_filtered'] += 1
+                continue
+
+            if last_date_index < width:
+                fields = [row[i] for i in date_indices]
+            else:
+                fields = [row[i] if i < width else '' for i in date_indices]
+
+            regions.append(region_name)
+            states.append(state)
+            rows.append(_parse_row_values(fields, dtype))
+
+    if rows:
+        values = np.vstack(rows)
+    else:
+        values = np.empty((0, len(dates)), dtype=dtype)
+
+    if report is not None:
+        report.add_time('row_parse', time.perf_counter() - start, rows=stats['rows_read'])
+        for name, value in stats.items():
+            report.count(name, value)
+
+    return {
+        'regions': regions,
+        'states': states,
+        'dates': dates,
+        'region_index': {name: i for i, name in enumerate(regions)},
+        'values': values,
+    }
+
+def compute_latest_metrics(values, window_size=WINDOW_SIZE):
+    """Vectorized latest value, trend and rent estimate for every region
+
+    Mirrors compute_metro_record(): missing months are dropped and the
+    remaining values are taken newest first, so a gap in the latest month
+    shifts older months into the recent average. The newest half of the
+    window is compared with the older half (3 vs 3 months by default), so
+    window_size must be even.
+    """
+    if window_size < 2 or window_size % 2:
+        raise ValueError(f"window_size must be an even number of months, got {window_size}")
+    half = window_size // 2
+    n_regions, n_months = values.shape
+
+    # Newest month first, padded with NaN when the file has fewer months
+    window = np.full((n_regions, window_size), np.nan)
+    take = min(window_size, n_months)
+    if take:
+        window[:, :take] = values[:, n_months - take:][:, ::-1]
+
+    valid = ~np.isnan(window)
+    count = valid.sum(axis=1)
+
+    # Compact valid values to the front of each row, keeping their order
+    order = np.argsort(~valid, axis=1, kind='stable')
+    compact = np.take_along_axis(window, order, axis=1)
+    compact[np.arange(window_size)[None, :] >= count[:, None]] = 0.0
+
+    # Summed left to right so results match Python's sum() exactly
+    recent_sum = compact[:, 0].copy()
+    previous_sum = compact[:, half].copy()
+    for i in range(1, half):
+        recent_sum += compact[:, i]
+        previous_sum += compact[:, half + i]
+    recent_count = np.minimum(count, half)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        latest_value = recent_sum / recent_count
+        previous_avg = previous_sum / half
+        change_pct = ((recent_sum / half - previous_avg) / previous_avg) * 100
+
+    full_window = count >= window_size
+    trend = np.full(n_regions, 'stable', dtype=object)
+    trend[full_window & (change_pct > 2)] = 'up'
+    trend[full_window & (change_pct < -2)] = 'down'
+
+    return {
+        'has_data': count > 0,
+        'home_value': latest_value,
+        'rent_estimate': np.round(latest_value * RENT_TO_HOME_VALUE_RATIO, 0),
+        'trend': trend,
+    }
+
+def parse_zillow_matrix(csv_path, region_filter=None, report=None):
+    """Drop-in replacement for parse_zillow_csv() backed by the matrix engine"""
+    matrix = load_zhvi_matrix(csv_path, region_filter=region_filter, report=report)
+    dates = matrix['dates']
+    print(f"Latest columns: {dates[::-1][:3]}...")
+    print(f"Loaded {len(matrix['regions'])} regions x {len(dates)} months")
+
+    start = time.perf_counter()
+    metrics = compute_latest_metrics(matrix['values'])
+    last_updated = dates[-1] if dates else '2024-12-31'
+
+    metro_data = {}
+    home_values = metrics['home_value'].tolist()
+    rent_estimates = metrics['rent_estimate'].tolist()
+    trends = metrics['trend']
+
+    # Rows are applied in file order so duplicate regions resolve like the
+    # row-by-row parser: the last row with data wins
+    for i in np.flatnonzero(metrics['has_data']).tolist():
+        region_name = matrix['regions'][i]
+        metro_data[region_name] = {
+            'region_name': region_name,
+            'state': matrix['states'][i],
+            'home_value': home_values[i],
+            'rent_estimate': rent_estimates[i],
+            'trend': trends[i],
+            'last_updated': last_updated,
+        }
+
+    if report is not None:
+        computed = len(matrix['regions'])
+        report.add_time('compute', time.perf_counter() - start, rows=computed)
+        report.count('rows_missing_values', computed - int(metrics['has_data'].sum()))
+
+    return metro_data
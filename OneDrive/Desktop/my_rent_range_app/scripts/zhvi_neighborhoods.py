@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Zip-level ZHVI aggregation into neighborhood and city rent figures
+Streams the zip-level ZHVI file once, joins each zip to a local crosswalk
+CSV (zip, state, city, neighborhood; a zip may map to several
+neighborhoods) and folds its rent estimate into per-neighborhood and
+per-city accumulators keyed by a hash lookup. Each group keeps a count, a
+running sum and a P-square median sketch (Jain & Chlamtac, 1985) of at
+most 64 values, so memory per group is bounded however many zips it holds.
+
+The neighborhood output mirrors NeighborhoodsDataSource
+(state -> city -> [{id, name, averageRent, ...}]).
+
+With --rent-ratios, each zip's rent uses the calibrated ratio of its metro.
+The metro comes from the zip file's Metro column ('Denver-Aurora-Lakewood,
+CO' -> 'Denver, CO', Zillow's metro RegionName), or from City and
+StateName when the file has no Metro column. Zips whose metro has no fit
+use the national ratio.
+"""
+
+import bisect
+import csv
+import re
+
+from parse_zillow_data import build_column_plan, compute_metro_record, iter_projected_rows, open_zhvi_csv, rent_ratio
+
+class P2Quantile:
+    """Streaming estimate of one quantile in constant memory (P-square)
+
+    The first `exact_limit` values are kept sorted, so small groups (most
+    neighborhoods span a handful of zips) get exact quantiles. Past that,
+    the five markers are seeded from those values and updated per value.
+    """
+
+    def __init__(self, p=0.5, exact_limit=64):
+        self.p = p
+        self.exact_limit = max(exact_limit, 5)
+        self.count = 0
+        self.heights = []
+        self.positions = None
+        self.desired = None
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def _seed_markers(self):
+        values = self.heights
+        last = len(values) - 1
+        self.desired = [last * increment for increment in self.increments]
+        self.positions = [round(position) for position in self.desired]
+        self.heights = [values[position] for position in self.positions]
+
+    def add(self, x):
+        self.count += 1
+        if self.positions is None:
+            bisect.insort(self.heights, x)
+            if self.count > self.exact_limit:
+                self._seed_markers()
+            return
+
+        q = self.heights
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the three middle markers toward their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        """The quantile estimate, exact (interpolated) while values are still kept"""
+        q = self.heights
+        if not q:
+            return None
+        if self.positions is not None:
+            return q[2]
+        rank = self.p * (len(q) - 1)
+        low = int(rank)
+        high = min(low + 1, len(q) - 1)
+        return q[low] + (q[high] - q[low]) * (rank - low)
+
+class GroupStats:
+    """Constant-size accumulator for one neighborhood or city"""
+
+    __slots__ = ('count', 'rent_sum', 'value_sum', 'rent_median')
+
+    def __init__(self):
+        self.count = 0
+        self.rent_sum = 0.0
+        self.value_sum = 0.0
+        self.rent_median = P2Quantile(0.5)
+
+    def add(self, record):
+        self.count += 1
+        self.rent_sum += record['rent_estimate']
+        self.value_sum += record['home_value']
+        self.rent_median.add(record['rent_estimate'])
+
+    def to_dict(self):
+        return {
+            'averageRent': round(self.rent_sum / self.count, 0),
+            'medianRent': round(self.rent_median.value(), 0),
+            'averageHomeValue': round(self.value_sum / self.count, 0),
+            'zipCount': self.count,
+        }
+
+def normalize_zip(zip_code):
+    """Five-digit zip string; Zillow sometimes drops leading zeros"""
+    zip_code = zip_code.strip()
+    return zip_code.zfill(5) if zip_code.isdigit() else zip_code
+
+def slugify(name):
+    """Neighborhood id in the style of neighborhoods_data.dart ('dupont-circle')"""
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+def metro_region_name(metro):
+    """Zillow metro RegionName for a zip file's Metro field, or None if blank"""
+    name, _, states = metro.partition(',')
+    name = name.split('-')[0].split('/')[0].strip()
+    if not name or not states.strip():
+        return None
+    return f"{name}, {states.strip().split('-')[0]}"
+
+def load_crosswalk(crosswalk_path):
+    """Map zip -> [(state, city, neighborhood)] from a zip,state,city,neighborhood CSV"""
+    crosswalk = {}
+    with open(crosswalk_path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            zip_code = normalize_zip(row.get('zip') or '')
+            state = (row.get('state') or '').strip().upper()
+            city = (row.get('city') or '').strip()
+            neighborhood = (row.get('neighborhood') or '').strip()
+            if zip_code and state and city and neighborhood:
+                crosswalk.setdefault(zip_code, []).append((state, city, neighborhood))
+    return crosswalk
+
+def aggregate_neighborhoods(csv_path, crosswalk, calibration=None):
+    """One streaming pass over the zip file; returns (neighborhood_stats, city_stats)
+
+    Both are dicts keyed by (state, city, neighborhood) and (state, city),
+    in order of first appearance in the crosswalk.
+    """
+    neighborhood_stats = {}
+    city_stats = {}
+    for places in crosswalk.values():
+        for state, city, neighborhood in places:
+            neighborhood_stats.setdefault((state, city, neighborhood), GroupStats())
+            city_stats.setdefault((state, city), GroupStats())
+
+    zips = 0
+    with open_zhvi_csv(csv_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        plan = build_column_plan(header)
+        print(f"Latest columns: {plan['latest_cols'][:3]}...")
+
+        metro_index = None
+        if calibration is not None:
+            # Project the metro (or city) field as one extra trailing value
+            positions = {col: i for i, col in enumerate(header)}
+            metro_index = positions.get('Metro', positions.get('City'))
+            has_metro = 'Metro' in positions
+            if metro_index is not None:
+                plan = dict(plan, value_indices=plan['value_indices'] + [metro_index])
+
+        rows = ((normalize_zip(zip_code), state, raw_values)
+                for zip_code, state, raw_values in iter_projected_rows(reader, plan))
+        for zip_code, state, raw_values in rows:
+            places = crosswalk.get(zip_code)
+            if places is None:
+                continue
+            metro = None
+            if metro_index is not None:
+                field = raw_values.pop().strip()
+                metro = metro_region_name(field) if has_metro else (f"{field}, {state}" if field else None)
+            record = compute_metro_record(zip_code, state, raw_values, plan['latest_cols'])
+            if record is None:
+                continue
+            if calibration is not None:
+                record['rent_estimate'] = round(record['home_value'] * rent_ratio(metro, calibration), 0)
+            zips += 1
+            cities = set()
+            for place in places:
+                neighborhood_stats[place].add(record)
+                cities.add(place[:2])
+            for city in cities:
+                city_stats[city].add(record)
+
+    print(f"Aggregated {zips} zips")
+    return neighborhood_stats, city_stats
+
+def neighborhoods_output(neighborhood_stats):
+    """state -> city -> [neighborhood record], skipping groups with no zips"""
+    output = {}
+    for (state, city, neighborhood), stats in neighborhood_stats.items():
+        if not stats.count:
+            continue
+        record = {'id': slugify(neighborhood), 'name': neighborhood}
+        record.update(stats.to_dict())
+        output.setdefault(state, {}).setdefault(city, []).append(record)
+    return output
+
+def cities_output(city_stats):
+    """state -> city -> aggregate record, skipping groups with no zips"""
+    output = {}
+    for (state, city), stats in city_stats.items():
+        if stats.count:
+            output.setdefault(state, {})[city] = stats.to_dict()
+    return output
+
+def run_neighborhoods(csv_path, crosswalk_path, calibration=None):
+    """Aggregate a zip-level file; returns (neighborhoods, cities) output dicts"""
+    crosswalk = load_crosswalk(crosswalk_path)
+    print(f"Loaded crosswalk for {len(crosswalk)} zips")
+    neighborhood_stats, city_stats = aggregate_neighborhoods(csv_path, crosswalk, calibration)
+    return neighborhoods_output(neighborhood_stats), cities_output(city_stats)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Pipelined execution of the Zillow refresh
+Reading, row parsing/computation and output run as concurrent stages joined
+by bounded queues. File reads release the GIL, so on slow or network storage
+reading overlaps with parsing. A full queue blocks its producer
+(backpressure), and an error in any stage stops the others and is re-raised
+in the caller. Output is identical to the sequential path.
+"""
+
+import csv
+import io
+import queue
+import threading
+import time
+
+from parse_zillow_data import (
+    build_column_plan, iter_projected_rows, open_zhvi_binary, timed_records, write_json,
+)
+
+# Bytes read per block by the reader stage
+READ_CHUNK_BYTES = 4 * 1024 * 1024
+# Blocks or record batches buffered between two stages
+QUEUE_SIZE = 8
+
+_DONE = object()
+
+class PipelineStopped(Exception):
+    """Raised inside a stage when another stage has failed"""
+
+def _put(q, item, stop):
+    """Blocking put that gives up once the pipeline is stopping"""
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+def _get(q, stop):
+    """Blocking get that gives up once the pipeline is stopping"""
+    while True:
+        if stop.is_set():
+            raise PipelineStopped()
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+def read_stage(open_binary, out_q, stop, chunk_size=READ_CHUNK_BYTES, report=None):
+    """Read the file in large blocks and emit text chunks ending on a line break"""
+    remainder = b''
+    read_seconds = 0.0
+    bytes_read = 0
+    with open_binary() as f:
+        while True:
+            start = time.perf_counter()
+            block = f.read(chunk_size)
+            read_seconds += time.perf_counter() - start
+            bytes_read += len(block)
+            if not block:
+                break
+            block = remainder + block
+            cut = block.rfind(b'\n') + 1
+            if cut == 0:
+                remainder = block
+                continue
+            remainder = block[cut:]
+            _put(out_q, block[:cut].decode('utf-8'), stop)
+    if remainder:
+        _put(out_q, remainder.decode('utf-8'), stop)
+    _put(out_q, _DONE, stop)
+    if report is not None:
+        report.add_time('read', read_seconds)
+        report.count('bytes_read', bytes_read)
+
+def parse_stage(in_q, out_q, stop, region_filter=None, report=None):
+    """Parse text chunks into batches of (region_name, record)"""
+    plan = None
+    while True:
+        text = _get(in_q, stop)
+        if text is _DONE:
+            break
+        reader = csv.reader(io.StringIO(text, newline=''))
+        if plan is None:
+            start = time.perf_counter()
+            plan = build_column_plan(next(reader, []))
+            print(f"Latest columns: {plan['latest_cols'][:3]}...")
+            if report is not None:
+                report.add_time('header_scan', time.perf_counter() - start)
+
+        # Fresh stats per chunk: timed_records() adds them to the report
+        stats = {} if report is not None else None
+        rows = iter_projected_rows(reader, plan, region_filter, stats)
+        batch = list(timed_records(rows, plan['latest_cols'], report, stats))
+        if batch:
+            _put(out_q, batch, stop)
+    _put(out_q, _DONE, stop)
+
+def write_stage(in_q, stop, matcher, output_path, result, report=None):
+    """Collect records as they arrive, then match and serialize the output
+
+    The output is ordered by the city mapping, so serialization itself
+    starts once the last record is in.
+    """
+    metro_data = {}
+    while True:
+        batch = _get(in_q, stop)
+        if batch is _DONE:
+            break
+        for region_name, record in batch:
+            metro_data[region_name] = record
+
+    start = time.perf_counter()
+    matched_data, match_report = matcher.match(metro_data)
+    matched = time.perf_counter()
+    write_json(matched_data, output_path)
+    if report is not None:
+        report.add_time('match', matched - start, rows=len(metro_data))
+        report.add_time('write', time.perf_counter() - matched, rows=len(matched_data))
+    result.update(metro_data=metro_data, matched_data=matched_data, match_report=match_report)
+
+def run_pipelined(csv_path, output_path, matcher, queue_size=QUEUE_SIZE,
+                  chunk_size=READ_CHUNK_BYTES, open_binary=None, report=None):
+    """Run read -> parse -> write as concurrent stages
+
+    open_binary is a zero-argument callable returning a binary file object;
+    it defaults to opening csv_path, decompressing it if needed. Returns (metro_data, matched_data,
+    match_report) like the sequential path. With a RunReport, each stage
+    adds its own busy time (not time spent waiting on a queue), so stage
+    times overlap and can add up to more than the wall time.
+    """
+    if open_binary is None:
+        def open_binary():
+            return open_zhvi_binary(csv_path)
+
+    chunks_q = queue.Queue(maxsize=queue_size)
+    records_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    result = {}
+
+    def guarded(target, *args):
+        def run():
+            try:
+                target(*args)
+            except PipelineStopped:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+        return threading.Thread(target=run, name=target.__name__, daemon=True)
+
+    threads = [
+        guarded(read_stage, open_binary, chunks_q, stop, chunk_size, report),
+        guarded(parse_stage, chunks_q, records_q, stop, matcher, report),
+        guarded(write_stage, records_q, stop, matcher, output_path, result, report),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return result['metro_data'], result['matched_data'], result['match_report']
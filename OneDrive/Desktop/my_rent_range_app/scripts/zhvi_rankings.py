@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Top-k / bottom-k market rankings over every region in a ZHVI file
+Streams the file once and reads only the last max(windows) + 1 months of
+each row. Every region is ranked, not only the ones we match to a city.
+Each ranking (one metric, nationally or within one state) keeps two
+bounded heaps of k entries, so memory per ranking stays constant however
+many regions the file has, and the full region set is never sorted.
+
+Metrics follow zhvi_analytics.py: rent_estimate (as in zillow_data.json),
+change_{n}m_pct (latest month vs n months earlier) and volatility_{n}m_pct
+(standard deviation of monthly returns over the last n months). Rows are
+ranked as they come, so a city name that appears in two states is ranked
+twice, once per state.
+"""
+
+import csv
+import heapq
+import math
+
+from parse_zillow_data import (
+    WINDOW_SIZE, compute_metro_record, get_date_columns, iter_projected_rows, open_zhvi_csv, rent_ratio,
+)
+
+DEFAULT_K = 10
+DEFAULT_WINDOWS = (3, 6, 12)
+
+class TopK:
+    """The k largest and k smallest values added, in O(k) memory
+
+    Ties keep the earlier region, so rankings follow file order (SizeRank)
+    among equal values.
+    """
+
+    __slots__ = ('k', 'count', 'top', 'bottom')
+
+    def __init__(self, k):
+        self.k = k
+        self.count = 0
+        self.top = []     # min-heap of (value, -seq, item)
+        self.bottom = []  # min-heap of (-value, -seq, item)
+
+    def add(self, value, item):
+        self.count += 1
+        seq = -self.count
+        top = self.top
+        if len(top) < self.k:
+            heapq.heappush(top, (value, seq, item))
+        elif value > top[0][0]:
+            heapq.heapreplace(top, (value, seq, item))
+        bottom = self.bottom
+        if len(bottom) < self.k:
+            heapq.heappush(bottom, (-value, seq, item))
+        elif -value > bottom[0][0]:
+            heapq.heapreplace(bottom, (-value, seq, item))
+
+    def ranked(self):
+        """([(value, item)] highest first, [(value, item)] lowest first)"""
+        top = [(value, item) for value, _, item in sorted(self.top, reverse=True)]
+        bottom = [(-value, item) for value, _, item in sorted(self.bottom, reverse=True)]
+        return top, bottom
+
+def build_ranking_plan(header_row, windows):
+    """Column plan for iter_projected_rows() covering the last max(windows) + 1 months"""
+    positions = {col: i for i, col in enumerate(header_row)}
+    dates = get_date_columns(header_row)
+    dates.reverse()
+    recent_cols = dates[:max(max(windows), WINDOW_SIZE - 1) + 1]
+    return {
+        'region_index': positions.get('RegionName'),
+        'state_index': positions.get('StateName'),
+        'latest_cols': recent_cols,
+        'value_indices': [positions[col] for col in recent_cols],
+    }
+
+def _parse_value(val):
+    val = val.strip()
+    if not val:
+        return None
+    try:
+        value = float(val)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+def region_metrics(values, windows):
+    """{metric: value} for one region from its recent values, newest first
+
+    Metrics that are undefined for the region (missing months) are left out.
+    """
+    metrics = {}
+    latest = values[0]
+    returns = []
+    for i in range(max(windows)):
+        newer = values[i] if i < len(values) else None
+        older = values[i + 1] if i + 1 < len(values) else None
+        returns.append(newer / older - 1.0 if newer is not None and older else None)
+
+    for n in windows:
+        if latest is not None and n < len(values) and values[n]:
+            metrics[f'change_{n}m_pct'] = (latest / values[n] - 1.0) * 100
+
+        # Population standard deviation, as zhvi_analytics.window_std()
+        window = [r for r in returns[:n] if r is not None]
+        if len(window) > 1:
+            mean = sum(window) / len(window)
+            variance = max(sum(r * r for r in window) / len(window) - mean * mean, 0.0)
+            metrics[f'volatility_{n}m_pct'] = math.sqrt(variance) * 100
+    return metrics
+
+def stream_rankings(csv_path, k=DEFAULT_K, windows=DEFAULT_WINDOWS, calibration=None):
+    """One pass over the file; returns (national, by_state, as_of)
+
+    national is {metric: TopK}, by_state is {state: {metric: TopK}}.
+    """
+    national = {}
+    by_state = {}
+    with open_zhvi_csv(csv_path) as f:
+        reader = csv.reader(f)
+        plan = build_ranking_plan(next(reader, []), windows)
+        latest_cols = plan['latest_cols']
+        if not latest_cols:
+            raise ValueError(f"{csv_path} has no date columns (YYYY-MM-DD) to rank")
+        as_of = latest_cols[0]
+        print(f"Ranking over {len(latest_cols)} months ending {as_of}")
+
+        regions = 0
+        for region_name, state, raw_values in iter_projected_rows(reader, plan):
+            values = [_parse_value(val) for val in raw_values]
+            metrics = region_metrics(values, windows)
+            record = compute_metro_record(region_name, state, raw_values[:WINDOW_SIZE], latest_cols[:WINDOW_SIZE])
+            if record is not None:
+                metrics['rent_estimate'] = round(record['home_value'] * rent_ratio(region_name, calibration), 0)
+            if not metrics:
+                continue
+
+            regions += 1
+            item = (region_name, state)
+            state_rankings = by_state.setdefault(state, {})
+            for metric, value in metrics.items():
+                ranking = national.get(metric)
+                if ranking is None:
+                    ranking = national[metric] = TopK(k)
+                ranking.add(value, item)
+                ranking = state_rankings.get(metric)
+                if ranking is None:
+                    ranking = state_rankings[metric] = TopK(k)
+                ranking.add(value, item)
+
+    print(f"Ranked {regions} regions across {len(by_state)} states")
+    return national, by_state, as_of
+
+def rankings_table(rankings):
+    """{metric: {'count', 'top', 'bottom'}} with JSON-ready entries"""
+    table = {}
+    for metric in sorted(rankings):
+        ranking = rankings[metric]
+        top, bottom = ranking.ranked()
+        table[metric] = {
+            'count': ranking.count,
+            'top': [_entry(value, item) for value, item in top],
+            'bottom': [_entry(value, item) for value, item in bottom],
+        }
+    return table
+
+def _entry(value, item):
+    region_name, state = item
+    return {'region_name': region_name, 'state': state, 'value': round(value, 2)}
+
+def run_rankings(csv_path, k=DEFAULT_K, windows=DEFAULT_WINDOWS, calibration=None):
+    """Rank every region in the file; returns the output dict"""
+    national, by_state, as_of = stream_rankings(csv_path, k, windows, calibration)
+    return {
+        'as_of': as_of,
+        'k': k,
+        'national': rankings_table(national),
+        'states': {state: rankings_table(by_state[state]) for state in sorted(by_state)},
+    }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Per-stage instrumentation for the Zillow refresh pipeline
+Records wall time, rows/sec, row counters, peak RSS and allocation counts
+for each stage, with optional cProfile or tracemalloc hooks, and writes a
+machine-readable JSON run report.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ('cprofile', 'tracemalloc')
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes everywhere else
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+def timed_stage(report, name, rows=0):
+    """report.stage(), or a no-op when the run is not being instrumented"""
+    if report is None:
+        return nullcontext()
+    return report.stage(name, rows)
+
+class RunReport:
+    """Collects stage timings and counters for one pipeline run"""
+
+    def __init__(self, profile=None):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profile}")
+        self.profile = profile
+        self.stages = {}
+        self.counters = {}
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self._profiler = None
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {'seconds': 0.0, 'rows': 0})
+
+    def start(self):
+        """Start the optional profiler for the whole run"""
+        if self.profile == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif self.profile == 'tracemalloc':
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows=0):
+        """Time a contiguous stage and record memory figures at its end"""
+        if self.profile == 'tracemalloc':
+            tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield self._stage(name)
+        finally:
+            stage = self._stage(name)
+            stage['seconds'] += time.perf_counter() - start
+            stage['rows'] += rows
+            stage['allocated_blocks'] = stage.get('allocated_blocks', 0) + sys.getallocatedblocks() - blocks
+            stage['peak_rss_mb'] = peak_rss_mb()
+            if self.profile == 'tracemalloc':
+                stage['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+    def add_time(self, name, seconds, rows=0):
+        """Accumulate time for a stage interleaved with others (e.g. per row)
+
+        Memory figures for these show up on the enclosing stage() instead.
+        """
+        stage = self._stage(name)
+        stage['seconds'] += seconds
+        stage['rows'] += rows
+
+    def add_rows(self, name, rows):
+        """Credit rows to a stage whose row count is only known once it ends"""
+        self._stage(name)['rows'] += rows
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """Add another report's stage times and counters (e.g. from a worker process)
+
+        Times from workers running in parallel add up to more than the wall
+        time they took.
+        """
+        for name, stage in other.stages.items():
+            self.add_time(name, stage['seconds'], stage['rows'])
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def _profile_summary(self, limit=20):
+        if self.profile == 'cprofile' and self._profiler is not None:
+            self._profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+            return {'cprofile_top': out.getvalue().splitlines()}
+        if self.profile == 'tracemalloc' and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            return {'tracemalloc_top': [str(stat) for stat in snapshot.statistics('lineno')[:limit]]}
+        return {}
+
+    def to_dict(self):
+        stages = {}
+        for name, stage in self.stages.items():
+            stage = dict(stage)
+            if stage['rows'] and stage['seconds'] > 0:
+                stage['rows_per_sec'] = stage['rows'] / stage['seconds']
+            stages[name] = stage
+        return {
+            'started_at': self.started_at,
+            'wall_seconds': time.perf_counter() - self._start,
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': stages,
+            'counters': dict(self.counters),
+        }
+
+    def write(self, report_path):
+        """Finish profiling and save the report as JSON"""
+        data = self.to_dict()
+        data.update(self._profile_summary())
+        with open(report_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        return data
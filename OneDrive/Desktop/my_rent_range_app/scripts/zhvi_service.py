@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Local asyncio HTTP query service over zillow_data.json
+Holds the parser output in memory, indexed by city, state and Zillow
+region, and answers lookups and filtered listings over plain HTTP/1.1 with
+keep-alive. Encoded responses are kept in an LRU cache. When the artifact
+changes on disk it is reloaded in a worker thread and swapped in
+atomically, and the cache is cleared. Per-route latency histograms are
+served at /metrics.
+
+Endpoints (all GET, JSON responses):
+    /city/<name>                 one city record (case-insensitive)
+    /region/<region name>        cities matched to a Zillow region
+    /cities?state=TX&trend=up&min_rent=1000&max_rent=2500&limit=50
+    /metrics                     latency histograms, cache and reload stats
+    /health
+
+Usage:
+    python zhvi_service.py [--data zillow_data.json] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from parse_zillow_data import OUTPUT_PATH
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)
+MAX_REQUEST_BYTES = 16 * 1024
+
+class DataIndex:
+    """Immutable lookup tables over one generation of the data file"""
+
+    def __init__(self, data, mtime=None):
+        self.data = data
+        self.mtime = mtime
+        self.by_city = {}
+        self.by_state = {}
+        self.by_region = {}
+        for city_name, record in data.items():
+            self.by_city[city_name.lower()] = record
+            self.by_state.setdefault(record.get('state', '').upper(), []).append(record)
+            self.by_region.setdefault(record.get('region_name', '').lower(), []).append(record)
+
+    @classmethod
+    def load(cls, data_path):
+        mtime = os.stat(data_path).st_mtime_ns
+        with open(data_path, 'r') as f:
+            return cls(json.load(f), mtime)
+
+    def city(self, name):
+        return self.by_city.get(name.strip().lower())
+
+    def region(self, region_name):
+        return self.by_region.get(region_name.strip().lower(), [])
+
+    def cities(self, state=None, trend=None, min_rent=None, max_rent=None, limit=None):
+        """Filtered listing; the state index narrows the scan when given"""
+        records = self.by_state.get(state.upper(), []) if state else self.data.values()
+        results = []
+        for record in records:
+            if trend and record.get('trend') != trend:
+                continue
+            rent = record.get('rent_estimate')
+            if min_rent is not None and (rent is None or rent < min_rent):
+                continue
+            if max_rent is not None and (rent is None or rent > max_rent):
+                continue
+            results.append(record)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count and sum"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, ms):
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last)"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def to_dict(self):
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ['le_inf']
+        return {
+            'count': self.count,
+            'mean_ms': self.total_ms / self.count if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p99_ms': self.quantile(0.99),
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+def _json_bytes(payload):
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def _first(query, name):
+    values = query.get(name)
+    return values[0] if values else None
+
+def _number(query, name, cast=float):
+    value = _first(query, name)
+    if value is None or value == '':
+        return None
+    return cast(value)
+
+class QueryService:
+    """Routes requests against the current DataIndex"""
+
+    def __init__(self, data_path, cache_size=1024, reload_interval=2.0):
+        self.data_path = Path(data_path)
+        self.reload_interval = reload_interval
+        self.index = DataIndex.load(self.data_path)
+        self.cache = LRUCache(cache_size)
+        self.histograms = {}
+        self.reloads = 0
+        self.reload_errors = 0
+        self.started = time.time()
+
+    def route(self, target):
+        """(status, body bytes, route name, cacheable) for one request target"""
+        parts = urlsplit(target)
+        path = unquote(parts.path)
+        query = parse_qs(parts.query)
+
+        if path == '/health':
+            return 200, _json_bytes({'status': 'ok', 'cities': len(self.index.data)}), 'health', False
+        if path == '/metrics':
+            return 200, _json_bytes(self.metrics()), 'metrics', False
+        if path.startswith('/city/'):
+            record = self.index.city(path[len('/city/'):])
+            if record is None:
+                return 404, _json_bytes({'error': 'city not found'}), 'city', True
+            return 200, _json_bytes(record), 'city', True
+        if path.startswith('/region/'):
+            records = self.index.region(path[len('/region/'):])
+            return 200, _json_bytes(records), 'region', True
+        if path == '/cities':
+            try:
+                records = self.index.cities(
+                    state=_first(query, 'state'),
+                    trend=_first(query, 'trend'),
+                    min_rent=_number(query, 'min_rent'),
+                    max_rent=_number(query, 'max_rent'),
+                    limit=_number(query, 'limit', int),
+                )
+            except ValueError:
+                return 400, _json_bytes({'error': 'bad numeric parameter'}), 'cities', False
+            return 200, _json_bytes(records), 'cities', True
+        return 404, _json_bytes({'error': 'unknown endpoint'}), 'not_found', False
+
+    def respond(self, target):
+        """Cached route() result as (status, body, route name)"""
+        cached = self.cache.get(target)
+        if cached is not None:
+            return cached
+        status, body, route, cacheable = self.route(target)
+        if cacheable:
+            self.cache.put(target, (status, body, route))
+        return status, body, route
+
+    def observe(self, route, ms):
+        self.histograms.setdefault(route, LatencyHistogram()).observe(ms)
+
+    def metrics(self):
+        return {
+            'uptime_seconds': time.time() - self.started,
+            'cities': len(self.index.data),
+            'reloads': self.reloads,
+            'reload_errors': self.reload_errors,
+            'cache': {
+                'size': len(self.cache.entries),
+                'hits': self.cache.hits,
+                'misses': self.cache.misses,
+            },
+            'latency': {route: hist.to_dict() for route, hist in sorted(self.histograms.items())},
+        }
+
+    async def watch(self):
+        """Reload the data file whenever its mtime changes"""
+        loop = asyncio.get_running_loop()
+        failed_mtime = None
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            # Stays None when the stat itself fails, so nothing is marked failed
+            mtime = None
+            try:
+                mtime = os.stat(self.data_path).st_mtime_ns
+                if mtime in (self.index.mtime, failed_mtime):
+                    continue
+                # Parse off the event loop, then swap in one assignment
+                index = await loop.run_in_executor(None, DataIndex.load, self.data_path)
+            except (OSError, ValueError) as e:
+                # A half-written file fails to parse; keep serving the old one
+                # and retry once the file changes again
+                failed_mtime = mtime
+                self.reload_errors += 1
+                print(f"Reload failed, keeping the previous data: {e}")
+                continue
+            self.index = index
+            self.cache.clear()
+            self.reloads += 1
+            print(f"Reloaded {len(index.data)} cities from {self.data_path}")
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                start = time.perf_counter()
+                lines = head.decode('latin-1').split('\r\n')
+                request = lines[0].split()
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+
+                if len(request) != 3:
+                    status, body, route = 400, _json_bytes({'error': 'bad request'}), 'bad_request'
+                elif request[0] != 'GET':
+                    status, body, route = 405, _json_bytes({'error': 'only GET is supported'}), 'bad_request'
+                else:
+                    # Labels come from a fixed set, never from the client's path
+                    status, body, route = self.respond(request[1])
+                    if status == 404:
+                        route = 'not_found'
+
+                keep_alive = (len(request) == 3 and request[2] == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body
+                )
+                await writer.drain()
+                self.observe(route, (time.perf_counter() - start) * 1000)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+async def serve(data_path, host, port, cache_size, reload_interval):
+    service = QueryService(data_path, cache_size, reload_interval)
+    server = await asyncio.start_server(service.handle, host, port, limit=MAX_REQUEST_BYTES)
+    watcher = asyncio.create_task(service.watch())
+    print(f"Serving {len(service.index.data)} cities from {data_path} on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        watcher.cancel()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', type=Path, default=OUTPUT_PATH, help='zillow_data.json to serve')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-size', type=int, default=1024, help='responses kept in the LRU cache')
+    parser.add_argument('--reload-interval', type=float, default=2.0,
+                        help='seconds between checks of the data file for changes')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.data, args.host, args.port, args.cache_size, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Byte-range sharded parsing of one large Zillow ZHVI CSV
+The file is split into newline-aligned byte ranges that worker processes
+parse independently with the header-derived column plan. Shard results are
+merged in file order, so the output matches parse_zillow_csv() exactly.
+
+Zillow CSVs never contain quoted newlines, which is what makes a newline a
+safe shard boundary.
+"""
+
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from parse_zillow_data import build_column_plan, detect_compression, iter_projected_rows, timed_records
+from zhvi_report import RunReport
+
+def read_header(csv_path):
+    """Return (header_row, byte offset of the first data row)"""
+    with open(csv_path, 'rb') as f:
+        line = f.readline()
+        header = next(csv.reader([line.decode('utf-8')]), [])
+        return header, f.tell()
+
+def plan_shards(csv_path, data_start, shard_count):
+    """Split the data section into newline-aligned (start, end) byte ranges"""
+    size = os.path.getsize(csv_path)
+    if size <= data_start:
+        return []
+
+    step = max(1, (size - data_start) // max(1, shard_count))
+    boundaries = [data_start]
+
+    with open(csv_path, 'rb') as f:
+        for i in range(1, shard_count):
+            target = data_start + i * step
+            if target <= boundaries[-1]:
+                continue
+            # Reading from target - 1 keeps a row that starts exactly at target
+            f.seek(target - 1)
+            f.readline()
+            boundary = f.tell()
+            if boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def parse_shard(csv_path, start, end, plan, region_filter=None, timed=False):
+    """Worker entry point: parse rows in [start, end) into a metro_data dict
+
+    With timed=True, returns (metro_data, RunReport) with the shard's read,
+    row parse and compute times for the parent to merge.
+    """
+    report = RunReport() if timed else None
+    read_start = time.perf_counter()
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    if report is not None:
+        report.add_time('read', time.perf_counter() - read_start)
+
+    stats = {} if timed else None
+    metro_data = {}
+    reader = csv.reader(io.StringIO(text, newline=''))
+    rows = iter_projected_rows(reader, plan, region_filter, stats)
+    for region_name, record in timed_records(rows, plan['latest_cols'], report, stats):
+        metro_data[region_name] = record
+    if report is not None:
+        return metro_data, report
+    return metro_data
+
+def merge_shards(shard_results):
+    """Merge shard dicts in file order
+
+    Later rows overwrite earlier ones while keys keep the position of their
+    first appearance, which is exactly what one sequential dict would do.
+    """
+    metro_data = {}
+    for shard_data in shard_results:
+        for region_name, record in shard_data.items():
+            metro_data[region_name] = record
+    return metro_data
+
+def parse_zillow_csv_sharded(csv_path, region_filter=None, workers=None, shard_count=None, report=None):
+    """Parse one CSV across worker processes, same result as parse_zillow_csv()
+
+    With a RunReport, worker timings are summed into it, so row_parse and
+    compute show CPU time across all workers rather than wall time.
+    """
+    if detect_compression(csv_path):
+        raise ValueError("Sharded parsing needs byte offsets; decompress the CSV or use --pipelined")
+
+    workers = workers or os.cpu_count() or 1
+    shard_count = shard_count or workers
+
+    scan_start = time.perf_counter()
+    header, data_start = read_header(csv_path)
+    plan = build_column_plan(header)
+    print(f"Latest columns: {plan['latest_cols'][:3]}...")
+    if report is not None:
+        report.add_time('header_scan', time.perf_counter() - scan_start)
+
+    shards = plan_shards(csv_path, data_start, shard_count)
+    print(f"Parsing {len(shards)} shards with {workers} workers")
+
+    timed = report is not None
+    if workers == 1 or len(shards) <= 1:
+        results = [parse_shard(csv_path, start, end, plan, region_filter, timed) for start, end in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(parse_shard, csv_path, start, end, plan, region_filter, timed)
+                for start, end in shards
+            ]
+            results = [future.result() for future in futures]
+
+    if timed:
+        for _, shard_report in results:
+            report.merge(shard_report)
+        results = [metro_data for metro_data, _ in results]
+    return merge_shards(results)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Indexed SQLite store for the Zillow refresh
+Bulk-loads the matched regions, their full monthly ZHVI history and the
+derived rent estimates with batched executemany() calls inside a single
+transaction, with WAL journaling. Every insert is an upsert that skips
+rows whose values did not change, so a monthly refresh into an existing
+database only rewrites what moved. Regions that disappeared are deleted,
+as are months a region no longer reports (a blanked value or a dropped
+date column).
+
+Regions are keyed on (region_name, state): city- and zip-level files repeat
+names across states ("Springfield"), and each keeps its own history. A
+store written before that key (user_version 0) is dropped and rebuilt.
+
+Lookups like "all cities in state X with trend up" use the
+(state, trend) index instead of a full JSON scan.
+
+Usage:
+    python zhvi_sqlite.py query  zillow_data.sqlite STATE [TREND]
+    python zhvi_sqlite.py verify zillow_data.sqlite [zillow_data.json]
+"""
+
+import csv
+import json
+import sqlite3
+import sys
+from itertools import islice
+from pathlib import Path
+
+from parse_zillow_data import get_date_columns, open_zhvi_csv
+
+# Rows per executemany() call
+BATCH_ROWS = 10000
+
+# PRAGMA user_version of the current schema
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS regions (
+    region_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (region_name, state)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS monthly_values (
+    region_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    date TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (region_name, state, date),
+    FOREIGN KEY (region_name, state) REFERENCES regions(region_name, state)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rent_estimates (
+    city_name TEXT PRIMARY KEY,
+    region_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    home_value REAL NOT NULL,
+    rent_estimate REAL NOT NULL,
+    trend TEXT NOT NULL,
+    last_updated TEXT NOT NULL,
+    FOREIGN KEY (region_name, state) REFERENCES regions(region_name, state)
+);
+
+CREATE INDEX IF NOT EXISTS regions_state ON regions(state);
+CREATE INDEX IF NOT EXISTS monthly_values_date ON monthly_values(date);
+CREATE INDEX IF NOT EXISTS rent_estimates_state_trend ON rent_estimates(state, trend);
+CREATE INDEX IF NOT EXISTS rent_estimates_region ON rent_estimates(region_name, state);
+"""
+
+UPSERT_REGION = """
+INSERT INTO regions (region_name, state) VALUES (?, ?)
+ON CONFLICT (region_name, state) DO NOTHING
+"""
+
+UPSERT_MONTHLY_VALUE = """
+INSERT INTO monthly_values (region_name, state, date, value) VALUES (?, ?, ?, ?)
+ON CONFLICT (region_name, state, date) DO UPDATE SET value = excluded.value
+WHERE value IS NOT excluded.value
+"""
+
+UPSERT_RENT_ESTIMATE = """
+INSERT INTO rent_estimates (city_name, region_name, state, home_value, rent_estimate, trend, last_updated)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (city_name) DO UPDATE SET
+    region_name = excluded.region_name, state = excluded.state,
+    home_value = excluded.home_value, rent_estimate = excluded.rent_estimate,
+    trend = excluded.trend, last_updated = excluded.last_updated
+WHERE (region_name, state, home_value, rent_estimate, trend, last_updated) IS NOT
+    (excluded.region_name, excluded.state, excluded.home_value,
+     excluded.rent_estimate, excluded.trend, excluded.last_updated)
+"""
+
+def connect(db_path):
+    """Open the store with WAL journaling and the schema in place"""
+    # Autocommit mode, so the load controls its own transaction
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    (version,) = conn.execute('PRAGMA user_version').fetchone()
+    if version < SCHEMA_VERSION:
+        # Derived data: rebuilt in full by the next load
+        conn.executescript("""
+            DROP TABLE IF EXISTS rent_estimates;
+            DROP TABLE IF EXISTS monthly_values;
+            DROP TABLE IF EXISTS regions;
+        """)
+    conn.executescript(SCHEMA)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+def load_region_history(csv_path, regions):
+    """Full monthly history for the given (region_name, state) keys as
+    {(region_name, state): [(date, value)]}
+
+    Like parse_zillow_csv(), the last row for a region wins.
+    """
+    history = {}
+    with open_zhvi_csv(csv_path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        positions = {col: i for i, col in enumerate(header)}
+        region_index = positions.get('RegionName')
+        state_index = positions.get('StateName')
+        date_positions = [(col, positions[col]) for col in get_date_columns(header)]
+        if region_index is None or state_index is None:
+            return history
+
+        for row in reader:
+            width = len(row)
+            region_name = row[region_index].strip() if region_index < width else ''
+            state = row[state_index].strip() if state_index < width else ''
+            if (region_name, state) not in regions:
+                continue
+            months = []
+            for date, i in date_positions:
+                val = row[i].strip() if i < width else ''
+                if not val:
+                    continue
+                try:
+                    months.append((date, float(val)))
+                except ValueError:
+                    continue
+            history[region_name, state] = months
+    return history
+
+def executemany_batched(conn, sql, rows):
+    """executemany() over an iterable in BATCH_ROWS chunks"""
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, BATCH_ROWS))
+        if not batch:
+            return
+        conn.executemany(sql, batch)
+
+def delete_missing(conn, table, columns, keep):
+    """Delete rows of table whose key (a tuple of the given columns) is not in keep"""
+    stale = [key for key in conn.execute(f"SELECT DISTINCT {', '.join(columns)} FROM {table}") if key not in keep]
+    if stale:
+        where = ' AND '.join(f'{column} = ?' for column in columns)
+        conn.executemany(f'DELETE FROM {table} WHERE {where}', stale)
+
+def write_sqlite(matched_data, history, db_path):
+    """Upsert regions, monthly values and rent estimates in one transaction
+
+    Returns the number of rows inserted, updated or deleted.
+    """
+    regions = {(record['region_name'], record['state']) for record in matched_data.values()}
+
+    def monthly_values():
+        for region_name, state in sorted(regions):
+            for date, value in history.get((region_name, state), []):
+                yield region_name, state, date, value
+
+    conn = connect(db_path)
+    try:
+        before = conn.total_changes
+        conn.execute('BEGIN')
+        try:
+            delete_missing(conn, 'rent_estimates', ('city_name',), {(city_name,) for city_name in matched_data})
+            # Covers regions that disappeared as well as single months
+            delete_missing(conn, 'monthly_values', ('region_name', 'state', 'date'),
+                           {(region_name, state, date) for region_name, state, date, _ in monthly_values()})
+            delete_missing(conn, 'regions', ('region_name', 'state'), regions)
+
+            executemany_batched(conn, UPSERT_REGION, sorted(regions))
+            executemany_batched(conn, UPSERT_MONTHLY_VALUE, monthly_values())
+            executemany_batched(conn, UPSERT_RENT_ESTIMATE, (
+                (city_name, record['region_name'], record['state'], record['home_value'],
+                 record['rent_estimate'], record['trend'], record['last_updated'])
+                for city_name, record in matched_data.items()
+            ))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return conn.total_changes - before
+    finally:
+        conn.close()
+
+def cities_by_state(conn, state, trend=None):
+    """Rent estimate rows for one state, optionally with one trend, by city"""
+    sql = 'SELECT * FROM rent_estimates WHERE state = ?'
+    params = [state]
+    if trend is not None:
+        sql += ' AND trend = ?'
+        params.append(trend)
+    cursor = conn.execute(sql + ' ORDER BY city_name', params)
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
+
+def verify_store(db_path, json_path):
+    """Check the rent_estimates table holds exactly the JSON records"""
+    with open(json_path, 'r') as f:
+        expected = json.load(f)
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute('SELECT * FROM rent_estimates')
+        columns = [column[0] for column in cursor.description]
+        stored = {row[0]: dict(zip(columns, row)) for row in cursor}
+    finally:
+        conn.close()
+
+    errors = []
+    for city_name in stored.keys() - expected.keys():
+        errors.append(f"{city_name}: not in the JSON output")
+    for city_name, record in expected.items():
+        row = stored.get(city_name)
+        if row is None:
+            errors.append(f"{city_name}: missing from the store")
+        elif any(row[field] != value for field, value in record.items()):
+            errors.append(f"{city_name}: stored values differ")
+    return errors
+
+if __name__ == '__main__':
+    from parse_zillow_data import OUTPUT_PATH
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'query' and len(sys.argv) > 3:
+        conn = sqlite3.connect(sys.argv[2])
+        rows = cities_by_state(conn, sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None)
+        conn.close()
+        for row in rows:
+            print(f"  {row['city_name']}: ${row['rent_estimate']:,.0f}/mo (trend: {row['trend']})")
+        print(f"{len(rows)} cities")
+    elif command == 'verify' and len(sys.argv) > 2:
+        json_path = Path(sys.argv[3]) if len(sys.argv) > 3 else OUTPUT_PATH
+        errors = verify_store(sys.argv[2], json_path)
+        for error in errors:
+            print(f"  {error}")
+        print("Store OK" if not errors else f"Store FAILED ({len(errors)} errors)")
+        sys.exit(1 if errors else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
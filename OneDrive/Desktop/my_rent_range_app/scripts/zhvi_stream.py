@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory streaming mode for very large Zillow ZHVI CSVs
+The input is read through mmap and flows through a generator pipeline of
+parse -> compute -> match -> write. Only records for regions in the city
+mapping are ever held, so memory depends on the mapping, not the input size.
+"""
+
+import csv
+import json
+import mmap
+import time
+
+from parse_zillow_data import (
+    build_column_plan, detect_compression, iter_projected_rows, open_zhvi_csv, timed_records,
+)
+from zhvi_report import peak_rss_mb, timed_stage
+
+# Consumed mmap pages are released after every chunk of this many bytes
+RELEASE_CHUNK_BYTES = 32 * 1024 * 1024
+
+def iter_mmap_lines(mm):
+    """Yield decoded lines from a memory-mapped file without reading it all
+
+    Mapped pages count toward RSS once touched, so pages behind the read
+    position are dropped as we go to keep RSS flat on huge inputs.
+    """
+    can_release = hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+    released = 0
+    for line in iter(mm.readline, b''):
+        yield line.decode('utf-8')
+        if can_release and mm.tell() - released >= RELEASE_CHUNK_BYTES:
+            release_to = mm.tell() - mm.tell() % mmap.PAGESIZE
+            mm.madvise(mmap.MADV_DONTNEED, 0, release_to)
+            released = release_to
+
+def iter_records(rows, latest_cols, report=None, stats=None):
+    """Compute stage: yield metro records for rows that have data"""
+    for _, record in timed_records(rows, latest_cols, report, stats):
+        yield record
+
+def iter_matches(records, matcher):
+    """Match stage: yield records for regions that resolve to one of our cities"""
+    for record in records:
+        cities, _ = matcher.resolve(record['region_name'], record['state'])
+        if cities:
+            yield record
+
+def collect_matches(records, matcher, report=None):
+    """Keep the last record per matched region, then pick one per city
+
+    This is bounded by the city mapping, and keeping it lets duplicate rows
+    and competing regions resolve exactly like the in-memory path.
+    """
+    by_region = {}
+    for record in records:
+        by_region[record['region_name']] = record
+
+    start = time.perf_counter()
+    matched_data, _ = matcher.match(by_region)
+    if report is not None:
+        report.add_time('match', time.perf_counter() - start, rows=len(by_region))
+    return matched_data
+
+def write_stream(matched_data, output_path):
+    """Write stage: encode JSON chunk by chunk straight to the file"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        for chunk in json.JSONEncoder(indent=2).iterencode(matched_data):
+            f.write(chunk)
+
+def run_stages(lines, matcher, report=None):
+    """Chain the parse, compute and match stages over an iterable of lines"""
+    reader = csv.reader(lines)
+    start = time.perf_counter()
+    plan = build_column_plan(next(reader, []))
+    print(f"Latest columns: {plan['latest_cols'][:3]}...")
+    if report is not None:
+        report.add_time('header_scan', time.perf_counter() - start)
+
+    stats = {} if report is not None else None
+    rows = iter_projected_rows(reader, plan, matcher, stats)
+    records = iter_records(rows, plan['latest_cols'], report, stats)
+    matches = iter_matches(records, matcher)
+    return collect_matches(matches, matcher, report)
+
+def run_low_memory(csv_path, output_path, matcher, report=None):
+    """Run the whole pipeline over an mmap of csv_path and write output_path
+
+    Compressed inputs cannot be mapped, so they are streamed through the
+    decompressor instead, which is just as bounded. With a RunReport, the
+    streamed stages are timed under 'parse' (matching happens as rows
+    stream by) and the JSON output under 'write'.
+    """
+    with timed_stage(report, 'parse'):
+        if detect_compression(csv_path):
+            with open_zhvi_csv(csv_path) as f:
+                matched_data = run_stages(f, matcher, report)
+        else:
+            with open(csv_path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    matched_data = run_stages(iter_mmap_lines(mm), matcher, report)
+    if report is not None:
+        report.add_rows('parse', report.counters.get('rows_read', 0))
+
+    with timed_stage(report, 'write', rows=len(matched_data)):
+        write_stream(matched_data, output_path)
+
+    peak = peak_rss_mb()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MB")
+    return matched_data
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic Zillow ZHVI CSV generator
+Reproduces Zillow's column layout (RegionID, SizeRank, RegionName,
+RegionType, StateName, then one column per month) with realistic gaps:
+series that start late, occasional missing months and a few empty rows.
+The first rows reuse real names from the city mapping so matching has work
+to do.
+
+Usage:
+    python zhvi_synthetic.py OUTPUT.csv [ROWS] [MONTHS] [SEED]
+"""
+
+import argparse
+import calendar
+import csv
+import random
+import sys
+
+from parse_zillow_data import create_city_mapping
+
+STATES = [
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS',
+    'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC',
+    'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+]
+
+# Scales used by the benchmark harness (data rows per file)
+SCALES = {
+    'metro': 1000,
+    'city': 30000,
+    'zip': 100000,
+}
+
+def month_columns(months, end_year=2025, end_month=9):
+    """Month-end date headers, oldest first, ending at end_year-end_month"""
+    columns = []
+    year, month = end_year, end_month
+    for _ in range(months):
+        day = calendar.monthrange(year, month)[1]
+        columns.append(f"{year}-{month:02d}-{day:02d}")
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    columns.reverse()
+    return columns
+
+def region_names(rows, rng):
+    """Real mapping names first, then synthetic "Place N, ST" names"""
+    names = [name for name in create_city_mapping()][:rows]
+    while len(names) < rows:
+        names.append(f"Place {len(names)}, {rng.choice(STATES)}")
+    return names
+
+def generate_rows(rows, months, seed=0):
+    """Yield the header and then `rows` data rows"""
+    rng = random.Random(seed)
+    dates = month_columns(months)
+    yield ['RegionID', 'SizeRank', 'RegionName', 'RegionType', 'StateName'] + dates
+
+    for rank, name in enumerate(region_names(rows, rng)):
+        state = name.rsplit(', ', 1)[1]
+        value = rng.uniform(60000, 1500000)
+        # Most series cover the full history; some start years later
+        start = 0 if rng.random() < 0.7 else rng.randrange(months)
+        gap_rate = rng.choice([0.0, 0.0, 0.01, 0.05])
+        empty_row = rng.random() < 0.005
+
+        cells = []
+        for month in range(months):
+            value *= 1.0 + rng.gauss(0.003, 0.01)
+            if empty_row or month < start or rng.random() < gap_rate:
+                cells.append('')
+            else:
+                cells.append(f"{value:.10f}")
+
+        yield [str(100000 + rank), str(rank), name, 'msa', state] + cells
+
+def write_synthetic_csv(path, rows, months=300, seed=0):
+    """Write a synthetic ZHVI CSV to path"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerows(generate_rows(rows, months, seed))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('rows', type=int, nargs='?', default=SCALES['metro'], help='data rows (default: %(default)s)')
+    parser.add_argument('months', type=int, nargs='?', default=300, help='month columns (default: %(default)s)')
+    parser.add_argument('seed', type=int, nargs='?', default=0, help='random seed (default: %(default)s)')
+    args = parser.parse_args(argv)
+    if args.rows < 0 or args.months < 1:
+        parser.error('ROWS must be 0 or more and MONTHS at least 1')
+
+    write_synthetic_csv(args.output, args.rows, args.months, args.seed)
+    print(f"Wrote {args.rows} rows x {args.months} months to {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
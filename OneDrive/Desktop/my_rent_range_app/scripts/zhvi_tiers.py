@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Low/mid/high rent bands from the bottom, middle and top tier ZHVI files
+Zillow publishes the same regions per price tier (tier_0.0_0.33,
+tier_0.33_0.67, tier_0.67_1.0), each sorted by SizeRank. The three files
+are streamed side by side and merge-joined, so every file is read once, in
+order, and nothing is buffered beyond the current line of each. Lines are
+only split far enough to get the key and name; the value columns are
+parsed just for regions we match. A region missing from a tier just leaves
+that side of its band empty.
+
+The join key is (SizeRank, RegionID) rather than RegionID alone: the files
+are sorted by SizeRank, not RegionID, so a merge join on RegionID would
+mean sorting (and holding) every file first. A region whose SizeRank
+differs between tier files therefore does not join; those regions are
+reported as rank mismatches (their RegionIDs are found among the rows that
+joined partially) rather than dropped silently.
+"""
+
+import csv
+from contextlib import ExitStack
+
+from parse_zillow_data import build_column_plan, compute_metro_record, open_zhvi_csv, rent_ratio
+
+TIERS = ('low', 'mid', 'high')
+
+# Zillow's column layout, which lets the join read keys without a full CSV parse
+LEADING_COLUMNS = ['RegionID', 'SizeRank', 'RegionName']
+
+def leading_field(text):
+    """First CSV field of text, honoring quotes ('"Dallas, TX",...' -> 'Dallas, TX')"""
+    if not text.startswith('"'):
+        return text.split(',', 1)[0].strip()
+    i = 1
+    while True:
+        i = text.find('"', i)
+        if i < 0:
+            return text[1:].replace('""', '"').strip()
+        if text.startswith('""', i):
+            i += 2
+            continue
+        return text[1:i].replace('""', '"').strip()
+
+def iter_keyed_lines(f, header, label, skipped=None):
+    """Yield ((size_rank, region_id), region_name, line), checking join order
+
+    Lines are split only as far as the key and name; tier_record() parses
+    the few that are kept. Files with another column layout are parsed in
+    full to find the same fields. Lines whose key does not parse cannot be
+    joined; they are counted in skipped[label] when a dict is passed.
+    """
+    positions = {col: i for i, col in enumerate(header)}
+    if 'RegionID' not in positions or 'SizeRank' not in positions:
+        raise ValueError(f"{label} tier file has no RegionID/SizeRank columns to join on")
+    id_index = positions['RegionID']
+    rank_index = positions['SizeRank']
+    name_index = positions.get('RegionName')
+    fast = header[:3] == LEADING_COLUMNS
+
+    previous = None
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            if fast:
+                region_id, size_rank, rest = line.split(',', 2)
+                key = (int(size_rank), int(region_id))
+                region_name = leading_field(rest)
+            else:
+                row = next(csv.reader([line]), [])
+                key = (int(row[rank_index]), int(row[id_index]))
+                region_name = row[name_index].strip() if name_index is not None and name_index < len(row) else ''
+        except (IndexError, ValueError):
+            if skipped is not None:
+                skipped[label] = skipped.get(label, 0) + 1
+            continue
+        if previous is not None and key < previous:
+            raise ValueError(f"{label} tier file is not sorted by SizeRank, RegionID "
+                             f"(row {key} after {previous})")
+        previous = key
+        yield key, region_name, line
+
+def merge_join(streams):
+    """Full outer merge join of keyed streams; yields (key, [item or None])"""
+    current = [next(stream, None) for stream in streams]
+    while True:
+        keys = [item[0] for item in current if item is not None]
+        if not keys:
+            return
+        key = min(keys)
+        items = []
+        for i, item in enumerate(current):
+            if item is not None and item[0] == key:
+                items.append(item)
+                current[i] = next(streams[i], None)
+            else:
+                items.append(None)
+        yield key, items
+
+def tier_record(line, plan):
+    """compute_metro_record() for one tier's CSV line, or None"""
+    if line is None:
+        return None
+    row = next(csv.reader([line]), [])
+    width = len(row)
+    region_index = plan['region_index']
+    state_index = plan['state_index']
+    region_name = row[region_index].strip() if region_index is not None and region_index < width else ''
+    state = row[state_index].strip() if state_index is not None and state_index < width else ''
+    if not region_name or not state:
+        return None
+    raw_values = [row[i] if i < width else '' for i in plan['value_indices']]
+    return compute_metro_record(region_name, state, raw_values, plan['latest_cols'])
+
+def parse_tier_bands(tier_paths, region_filter=None, calibration=None, skipped=None, rank_mismatches=None):
+    """Merge-join the three tier files into {region_name: band record}
+
+    Records look like the usual metro records (from the middle tier) plus
+    rent_low / rent_high. All three rents use the metro's ratio from
+    calibration when one is given. Like parse_zillow_csv(), the last row
+    for a region name wins. Pass a dict as skipped to count, per tier,
+    the rows dropped for an unreadable (SizeRank, RegionID) key, and a list
+    as rank_mismatches to collect the names of regions whose tiers did not
+    join because their SizeRank differs between files.
+    """
+    metro_data = {}
+    # RegionID -> SizeRank of rows missing from some tier, to spot rank mismatches
+    partial = {}
+    with ExitStack() as stack:
+        plans = []
+        streams = []
+        for label, path in zip(TIERS, tier_paths):
+            f = stack.enter_context(open_zhvi_csv(path))
+            header = next(csv.reader([f.readline()]), [])
+            plans.append(build_column_plan(header))
+            streams.append(iter_keyed_lines(f, header, label, skipped))
+        print(f"Latest columns: {plans[1]['latest_cols'][:3]}...")
+
+        for (size_rank, region_id), items in merge_join(streams):
+            # Only rows we would match get parsed beyond their key and name
+            region_name = next(item[1] for item in items if item is not None)
+            if region_filter is not None and region_name not in region_filter:
+                continue
+            if None in items:
+                other_rank = partial.setdefault(region_id, size_rank)
+                if other_rank != size_rank and rank_mismatches is not None:
+                    rank_mismatches.append(region_name)
+            low, mid, high = (tier_record(item and item[2], plan) for item, plan in zip(items, plans))
+            if mid is None:
+                continue
+            ratio = rent_ratio(mid['region_name'], calibration)
+            mid['rent_estimate'] = round(mid['home_value'] * ratio, 0)
+            mid['rent_low'] = round(low['home_value'] * ratio, 0) if low else None
+            mid['rent_high'] = round(high['home_value'] * ratio, 0) if high else None
+            metro_data[mid['region_name']] = mid
+    return metro_data
+
+def run_tiers(tier_paths, matcher, calibration=None):
+    """Build the rent bands and match them to our cities
+
+    The match report gains 'rows_bad_key': {tier: rows} for lines that
+    could not be joined, and 'rank_mismatches': [region_name] for regions
+    whose SizeRank differs between tier files.
+    """
+    skipped = {}
+    rank_mismatches = []
+    metro_data = parse_tier_bands(tier_paths, region_filter=matcher, calibration=calibration,
+                                  skipped=skipped, rank_mismatches=rank_mismatches)
+    print(f"Found {len(metro_data)} metros with a middle tier")
+    matched_data, match_report = matcher.match(metro_data)
+    match_report['rows_bad_key'] = skipped
+    match_report['rank_mismatches'] = rank_mismatches
+    return matched_data, match_report
@@ -0,0 +1,103 @@
+// Golden outputs of RentCalculator over a fixed input grid.
+//
+// scripts/zhvi_affordability.py ports RentCalculator to NumPy, and its
+// `verify` command runs the port over the same cases and checks it against
+// test/goldens/rent_calculator_parity.json. This test fails if the Dart
+// results differ from that file. Its "source" field says who wrote it;
+// until it reads "dart", the cases come from the Python port and `verify`
+// is not a parity check against Dart. Record (or, after an intended change
+// to the calculator, refresh) the Dart outputs with
+//
+//   flutter test --update-goldens test/rent_calculator_parity_test.dart
+
+import 'dart:convert';
+import 'dart:io';
+
+import 'package:flutter_test/flutter_test.dart';
+
+import 'package:myrentrangeapp/core/calculations/rent_calculator.dart';
+import 'package:myrentrangeapp/data/models/bedroom_config.dart';
+
+const goldenPath = 'test/goldens/rent_calculator_parity.json';
+
+/// Incomes per type, covering a zero income and one that nets out to zero
+const incomes = {
+  IncomeType.hourly: [7.25, 25.0, 62.5],
+  IncomeType.monthly: [0.0, 499.99, 4000.0],
+  IncomeType.annual: [35000.0, 60000.0, 187654.32],
+};
+
+/// A taxed state, a no-tax state in lower case and an unknown state
+const states = ['CA', 'tx', 'ZZ'];
+
+/// Cycled through the cases so every burden level shows up
+const actualRents = [800.0, 1500.0, 2750.0];
+
+/// Every grid combination with its RentCalculator results
+List<Map<String, Object>> buildCases() {
+  final cases = <Map<String, Object>>[];
+  for (final entry in incomes.entries) {
+    for (final income in entry.value) {
+      for (final state in states) {
+        for (final ownsCar in [false, true]) {
+          for (final hasRoommates in [false, true]) {
+            for (final bedroom in BedroomConfiguration.values) {
+              final actualRent = actualRents[cases.length % actualRents.length];
+              final result = RentCalculator.calculate(
+                grossIncome: income,
+                incomeType: entry.key,
+                stateAbbr: state,
+                ownsCar: ownsCar,
+                hasRoommates: hasRoommates,
+                bedroom: bedroom,
+                actualRent: actualRent,
+              );
+              cases.add({
+                'income': income,
+                'incomeType': entry.key.name,
+                'state': state,
+                'ownsCar': ownsCar,
+                'hasRoommates': hasRoommates,
+                'bedroom': bedroom.name,
+                'actualRent': actualRent,
+                'monthlyGross': RentCalculator.calculateMonthlyIncome(income, entry.key),
+                'netMonthly': result.netMonthlyIncome,
+                'conservative': result.affordableRent.conservative,
+                'balanced': result.affordableRent.balanced,
+                'stretch': result.affordableRent.stretch,
+                'burdenPercentage': result.burdenPercentage,
+                'burdenLevel': result.burdenLevel.name,
+              });
+            }
+          }
+        }
+      }
+    }
+  }
+  return cases;
+}
+
+/// One case per line, so a change to the calculator shows up as a small diff
+String encodeCases(List<Map<String, Object>> cases) {
+  return '{"source":"dart","cases":[\n${cases.map(jsonEncode).join(',\n')}\n]}\n';
+}
+
+void main() {
+  test('RentCalculator matches the parity goldens', () {
+    final cases = buildCases();
+    final file = File(goldenPath);
+
+    if (autoUpdateGoldenFiles) {
+      file.writeAsStringSync(encodeCases(cases));
+      return;
+    }
+
+    final golden = (jsonDecode(file.readAsStringSync())['cases'] as List)
+        .cast<Map<String, dynamic>>();
+    expect(cases.length, golden.length, reason: 'number of cases in $goldenPath');
+    for (var i = 0; i < cases.length; i++) {
+      // Exact equality: the Python port is checked bit for bit against these
+      expect(cases[i], equals(golden[i]), reason: 'case $i in $goldenPath');
+    }
+  });
+}